@@ -0,0 +1,141 @@
+import importlib
+import json
+import multiprocessing
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List
+
+import manim
+from manim import Scene, config, logger, tempconfig
+
+from profiling import RenderProfiler
+from stages import _partialMovieFiles, planStages
+from texcache import texCache
+
+# Fixed so results stay comparable between commits
+benchmarkConfig = {"quality": "low_quality", "disable_caching": True, "write_to_movie": True,
+                   "save_last_frame": False}
+
+
+def _maxRss(children: bool = False) -> int:
+    try:
+        import resource
+    except ImportError:
+        return 0
+
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _benchmarkStage(module: str, sceneName: str, index: int, name: str, mediaDir: str) -> dict:
+    # Runs in a fresh process so memory peaks belong to this stage alone, latex and ffmpeg count as children
+    sceneClass = getattr(importlib.import_module(module), sceneName)
+    with tempconfig({**benchmarkConfig, "media_dir": mediaDir, "output_file": f"{sceneName}Stage{index:02}"}):
+        start = time.perf_counter()
+        scene = sceneClass()
+        scene.renderOnly = (index, name)
+        profiler = RenderProfiler(scene).start()
+
+        Scene.render(scene)
+
+        wall = time.perf_counter() - start
+        profiler.stop()
+
+        rendered = scene.renderedStage or {"start": 0, "end": 0}
+        files = [Path(file) for file in _partialMovieFiles(scene)[rendered["start"]:rendered["end"]] if file]
+        frames = profiler.totals["frames"]
+
+        return {
+            "wall": wall,
+            "frames": frames,
+            "fps": frames / wall if wall else 0.0,
+            "animationTime": profiler.totals["animationTime"],
+            "texTime": profiler.totals["texTime"],
+            "texHits": texCache.hits,
+            "texMisses": texCache.misses,
+            "texCompiles": profiler.totals["texCompiles"],
+            "peakMemory": _maxRss(),
+            "childPeakMemory": _maxRss(children=True),
+            "outputFiles": len(files),
+            "outputBytes": sum(file.stat().st_size for file in files if file.exists()),
+        }
+
+
+def _revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def benchmarkScene(module: str, sceneName: str, only: List[str] = None, keep: bool = False) -> List[dict]:
+    # Every stage renders twice from its own media directory: cold with nothing compiled, then warm with the TeX
+    # (and trajectory) caches the cold run left behind. Partial movie and stage caching stay off for both
+    sceneClass = getattr(importlib.import_module(module), sceneName)
+    with tempconfig(benchmarkConfig):
+        plan = planStages(sceneClass)
+
+    results = []
+    spawn = multiprocessing.get_context("spawn")
+    for index, name in enumerate(plan):
+        if only and name not in only:
+            continue
+
+        mediaDir = tempfile.mkdtemp(prefix=f"bench_{sceneName}_{name}_")
+        try:
+            for cache in ("cold", "warm"):
+                with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+                    result = pool.submit(_benchmarkStage, module, sceneName, index, name, mediaDir).result()
+
+                results.append({"scene": sceneName, "stage": name, "index": index, "cache": cache, **result})
+                logger.info(f"{sceneName}.{name} ({cache}): {result['wall']:.2f}s, {result['fps']:.1f} fps, "
+                            f"{result['peakMemory'] / 2 ** 20:.0f}MB")
+        finally:
+            if not keep:
+                shutil.rmtree(mediaDir, ignore_errors=True)
+
+    return results
+
+
+def runBenchmarks(module: str, scenes: List[str], only: List[str] = None, output: Path = None,
+                  keep: bool = False) -> Path:
+    results = []
+    for sceneName in scenes:
+        results += benchmarkScene(module, sceneName, only, keep)
+
+    revision = _revision()
+    output = output or Path(config.media_dir) / "benchmarks" / f"{time.strftime('%Y%m%d-%H%M%S')}-{revision}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        "revision": revision,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "manim": manim.__version__,
+        "platform": platform.platform(),
+        "config": benchmarkConfig,
+        "results": results,
+    }, indent=2))
+
+    logger.info(f"Benchmark results written to {output}")
+    return output
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Render every stage in isolation with a cold and a warm TeX cache")
+    parser.add_argument("scenes", nargs="*", default=["Main", "Main3D"])
+    parser.add_argument("-m", "--module", default="main")
+    parser.add_argument("-s", "--stage", action="append", help="only benchmark these stages")
+    parser.add_argument("-o", "--output", type=Path, default=None)
+    parser.add_argument("--keep", action="store_true", help="keep the temporary media directories")
+    arguments = parser.parse_args()
+
+    runBenchmarks(arguments.module, arguments.scenes, arguments.stage, arguments.output, arguments.keep)
@@ -0,0 +1,141 @@
+import json
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+from manim import Mobject, config, logger, tempconfig
+
+from main import PPTXSceneFake
+from stages import skipRendering
+
+
+def _describe(mobject: Mobject) -> str:
+    for attribute in ("tex_string", "text"):
+        value = getattr(mobject, attribute, None)
+        if isinstance(value, str):
+            return f"{type(mobject).__name__} {value[:40]!r}"
+    return type(mobject).__name__
+
+
+class DryRunScene(PPTXSceneFake):
+    # Runs construct with every animation jumped straight to its end state: no frame is rasterized and nothing is
+    # encoded. Collects the slides, animation durations and the on-screen bounding boxes at every endSlide
+    def __init__(self, *args, **kwargs):
+        self.manifestSlides: List[dict] = []
+        self.slideAnimations: List[dict] = []
+        super().__init__(*args, **kwargs)
+
+    def play(self, *args, **kwargs):
+        self.compile_animation_data(*args, **kwargs)
+        animations = getattr(self, "animations", None) or []
+        duration = getattr(self, "duration", 0) or 0
+
+        self.begin_animations()
+        if duration > 0:
+            # Updaters get the whole play as one step, enough for where things end up
+            self.update_to_time(duration)
+        for animation in animations:
+            animation.finish()
+            animation.clean_up_from_scene(self)
+
+        self.slideAnimations.append({
+            "animations": [type(animation).__name__ for animation in animations],
+            "duration": duration,
+            "stage": getattr(self, "currentStage", None),
+        })
+
+    def endSlide(self, *args, **kwargs):
+        super().endSlide(*args, **kwargs)
+
+        boxes = self.boundingBoxes()
+        self.manifestSlides.append({
+            "index": len(self.manifestSlides),
+            "duration": sum(animation["duration"] for animation in self.slideAnimations),
+            "animations": self.slideAnimations,
+            "mobjects": boxes,
+            "outside": sum(box["outside"] for box in boxes),
+        })
+        self.slideAnimations = []
+
+    def frameBox(self) -> np.ndarray:
+        camera = self.camera
+        return np.array([-camera.frame_width / 2, -camera.frame_height / 2,
+                         camera.frame_width / 2, camera.frame_height / 2])
+
+    def boundingBoxes(self, tolerance: float = 1e-3) -> List[dict]:
+        # Boxes relative to the frame centre, projected through the camera first in 3D scenes
+        camera = self.camera
+        project = getattr(camera, "project_points", None)
+        cameraFrame = getattr(camera, "frame", None)
+        frame = self.frameBox()
+
+        boxes = []
+        for mobject in self.mobjects:
+            if mobject is cameraFrame:
+                continue
+
+            points = mobject.get_all_points()
+            if len(points) == 0:
+                continue
+
+            points = project(points) if project is not None else points - camera.frame_center
+            box = np.concatenate([points[:, :2].min(axis=0), points[:, :2].max(axis=0)])
+            outside = bool(np.any(box[:2] < frame[:2] - tolerance) or np.any(box[2:] > frame[2:] + tolerance))
+
+            boxes.append({"mobject": _describe(mobject), "box": np.round(box, 4).tolist(), "outside": outside})
+
+        return boxes
+
+
+def dryRun(sceneClass: type, output: Optional[Path] = None) -> Path:
+    # Builds the deck without a renderer pass: setup, construct, tear_down, then the manifest
+    start = time.perf_counter()
+    dryRunClass = type(f"{sceneClass.__name__}DryRun", (DryRunScene, sceneClass), {})
+
+    with tempconfig({"write_to_movie": False, "save_last_frame": False}):
+        scene = dryRunClass()
+        with skipRendering(scene):
+            scene.setup()
+            scene.construct()
+            scene.tear_down()
+
+    # Animations after the last endSlide still end up in the deck as a final slide
+    if scene.slideAnimations:
+        scene.endSlide()
+
+    slides = scene.manifestSlides
+    manifest = {
+        "scene": sceneClass.__name__,
+        "frame": [config.frame_width, config.frame_height],
+        "slideCount": len(slides),
+        "duration": sum(slide["duration"] for slide in slides),
+        "wall": time.perf_counter() - start,
+        "slides": slides,
+    }
+
+    output = output or Path(config.media_dir) / "dryrun" / f"{sceneClass.__name__}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(manifest, indent=2))
+
+    for slide in slides:
+        for box in slide["mobjects"]:
+            if box["outside"]:
+                logger.warning(f"Slide {slide['index']}: {box['mobject']} leaves the frame at {box['box']}")
+
+    logger.info(f"{sceneClass.__name__}: {len(slides)} slides, {manifest['duration']:.1f}s of animation, "
+                f"checked in {manifest['wall']:.1f}s, manifest written to {output}")
+    return output
+
+
+if __name__ == "__main__":
+    import argparse
+    import importlib
+
+    parser = argparse.ArgumentParser(description="Build a scene without rendering and write its slide manifest")
+    parser.add_argument("module")
+    parser.add_argument("scene")
+    parser.add_argument("-o", "--output", type=Path, default=None)
+    arguments = parser.parse_args()
+
+    dryRun(getattr(importlib.import_module(arguments.module), arguments.scene), arguments.output)
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+from manim import config
+
+from simulation import DoublePendulumEnsemble
+
+# Colour stops for log scaled flip times, fast flips are bright
+flipColours = np.array([
+    [255, 255, 255],
+    [252, 208, 80],
+    [222, 75, 60],
+    [110, 30, 120],
+    [20, 20, 70],
+])
+
+
+def neverFlips(theta1: np.ndarray, theta2: np.ndarray, m1: float = 1, m2: float = 1, l1: float = 1, l2: float = 1,
+               g: float = 9.81) -> np.ndarray:
+    # Released from rest, an arm can only go over the top if the starting potential energy reaches the lowest
+    # potential with that arm upright
+    potential = -(m1 + m2) * g * l1 * np.cos(theta1) - m2 * g * l2 * np.cos(theta2)
+    upright1 = (m1 + m2) * g * l1 - m2 * g * l2
+    upright2 = -(m1 + m2) * g * l1 + m2 * g * l2
+    return potential < min(upright1, upright2)
+
+
+def flipTimes(theta1: np.ndarray, theta2: np.ndarray, params: dict, maxTime: float, dt: float, substeps: int = 1,
+              compactEvery: int = 25) -> np.ndarray:
+    # Time until |theta_1| or |theta_2| first passes pi, inf when it doesn't within maxTime.
+    # Flipped members are dropped from the ensemble every compactEvery steps so later steps only cost the rest
+    times = np.full(theta1.size, np.inf)
+
+    active = np.flatnonzero(~neverFlips(theta1, theta2, **params))
+    ensemble = DoublePendulumEnsemble(theta1[active], theta2[active], **params)
+    done = np.zeros(active.size, dtype=bool)
+
+    steps = int(round(maxTime / dt))
+    for step in range(1, steps + 1):
+        if active.size == 0:
+            break
+
+        ensemble.step(dt, substeps)
+
+        flipped = (np.abs(ensemble.state[0]) > np.pi) | (np.abs(ensemble.state[1]) > np.pi)
+        flipped &= ~done
+        times[active[flipped]] = step * dt
+        done |= flipped
+
+        if step % compactEvery == 0 and done.any():
+            keep = ~done
+            active = active[keep]
+            ensemble = DoublePendulumEnsemble(*ensemble.state[:, keep], **params)
+            done = np.zeros(active.size, dtype=bool)
+
+    return times
+
+
+def _flipTile(path: Path, theta1: np.ndarray, theta2: np.ndarray, params: dict, maxTime: float, dt: float,
+              substeps: int) -> Path:
+    times = flipTimes(theta1.ravel(), theta2.ravel(), params, maxTime, dt, substeps).reshape(theta1.shape)
+
+    # Saved by the worker so tiles finished before an interruption are kept
+    tempPath = path.with_suffix(f".{os.getpid()}.tmp.npy")
+    np.save(tempPath, times.astype(np.float32))
+    os.replace(tempPath, path)
+    return path
+
+
+def flipMap(resolution: Tuple[int, int] = (1024, 1024), theta1Range=(-np.pi, np.pi), theta2Range=(-np.pi, np.pi),
+            maxTime: float = 10, dt: float = 0.01, substeps: int = 1, params: dict = None, tileSize: int = 256,
+            workers: int = None, directory: Optional[Path] = None) -> np.ndarray:
+    # Image ready (rows, columns) array of flip times, theta_1 along the columns and theta_2 up the rows
+    params = params or {}
+    width, height = resolution
+    directory = directory or Path(config.media_dir) / "flipmap"
+
+    description = json.dumps([resolution, theta1Range, theta2Range, maxTime, dt, substeps, params, tileSize],
+                             sort_keys=True)
+    tileDirectory = directory / hashlib.sha256(description.encode()).hexdigest()[:16]
+    tileDirectory.mkdir(parents=True, exist_ok=True)
+
+    theta1 = np.linspace(*theta1Range, width)
+    theta2 = np.linspace(*theta2Range, height)[::-1]
+
+    tiles = {}
+    for row in range(0, height, tileSize):
+        for column in range(0, width, tileSize):
+            tiles[tileDirectory / f"tile_{row:05}_{column:05}.npy"] = (row, column)
+
+    missing = [path for path in tiles if not path.exists()]
+    if missing:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            futures = []
+            for path in missing:
+                row, column = tiles[path]
+                grid1, grid2 = np.meshgrid(theta1[column:column + tileSize], theta2[row:row + tileSize])
+                futures.append(pool.submit(_flipTile, path, grid1, grid2, params, maxTime, dt, substeps))
+
+            for future in as_completed(futures):
+                future.result()
+
+    result = np.empty((height, width), dtype=np.float32)
+    for path, (row, column) in tiles.items():
+        tile = np.load(path)
+        result[row:row + tile.shape[0], column:column + tile.shape[1]] = tile
+
+    return result
+
+
+def flipMapImage(times: np.ndarray, maxTime: float) -> np.ndarray:
+    # RGB uint8 image, log scaled so the fast flipping regions keep their structure; never flipped is black
+    flipped = np.isfinite(times)
+    scaled = np.log1p(np.where(flipped, times, 0)) / np.log1p(maxTime)
+
+    stops = np.linspace(0, 1, len(flipColours))
+    image = np.zeros((*times.shape, 3), dtype=np.uint8)
+    for channel in range(3):
+        image[..., channel] = np.where(flipped, np.interp(scaled, stops, flipColours[:, channel]), 0)
+
+    return image
@@ -0,0 +1,201 @@
+import json
+import weakref
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from manim import Mobject, PMobject, ThreeDCamera, VMobject, config, logger
+
+from pointcloud import PointCloud, RingTrail
+
+
+def _describe(mobject: Mobject) -> str:
+    for attribute in ("tex_string", "text"):
+        value = getattr(mobject, attribute, None)
+        if isinstance(value, str):
+            return f"{type(mobject).__name__} {value[:40]!r}"
+    return type(mobject).__name__
+
+
+def _hasUpdaters(mobject: Mobject) -> bool:
+    return any(mob.updaters for mob in mobject.get_family())
+
+
+def _visible(mobject: Mobject) -> bool:
+    for mob in mobject.family_members_with_points():
+        if isinstance(mob, VMobject):
+            if np.any(mob.get_fill_opacities() > 0):
+                return True
+            if mob.get_stroke_width() > 0 and np.any(mob.get_stroke_opacities() > 0):
+                return True
+        elif isinstance(mob, PMobject):
+            if np.any(mob.rgbas[:, 3] > 0):
+                return True
+        else:
+            # Images, trackers and anything else without a known opacity count as visible
+            return True
+    return False
+
+
+class LifecycleScene:
+    # Mixin that owns every mobject added to the scene by the stage that added it. After each play and slide it
+    # parks mobjects that can't show up in a frame right now: fully transparent or (with a 2D camera) outside the
+    # frame. Before every play parked ones are checked again and put back in their place if they became visible,
+    # the camera moves, or the play animates them or one of their submobjects. Removing a parked mobject releases
+    # it. Empty mobjects, point clouds and mobjects with updaters are never touched, and nothing is parked while
+    # updaters run, since they can change anything mid-play. Goes before StageScene
+    sweepOffFrame = True
+    sweepExempt = (PMobject, PointCloud, RingTrail)
+
+    def __init__(self, *args, **kwargs):
+        self.mobjectOwners: "weakref.WeakKeyDictionary[Mobject, str]" = weakref.WeakKeyDictionary()
+        self.parked: List[Mobject] = []
+        self.parkedAnchors: Dict[int, Optional[weakref.ref]] = {}
+        self.lifecycleReport: Dict[str, dict] = defaultdict(lambda: {"added": 0, "swept": Counter(), "leaked": []})
+        super().__init__(*args, **kwargs)
+
+    def _owner(self) -> str:
+        return getattr(self, "currentStage", None) or "construct"
+
+    def add(self, *mobjects: Mobject):
+        owner = self._owner()
+        for mobject in mobjects:
+            if mobject in self.parked:
+                self.parked.remove(mobject)
+                self.parkedAnchors.pop(id(mobject), None)
+            if mobject not in self.mobjectOwners:
+                self.mobjectOwners[mobject] = owner
+                self.lifecycleReport[owner]["added"] += 1
+        return super().add(*mobjects)
+
+    def remove(self, *mobjects: Mobject):
+        # Removed on purpose, a later camera move must not bring it back
+        for mobject in mobjects:
+            if mobject in self.parked:
+                self.parked.remove(mobject)
+                self.parkedAnchors.pop(id(mobject), None)
+        return super().remove(*mobjects)
+
+    def clear(self):
+        self.parked.clear()
+        self.parkedAnchors.clear()
+        return super().clear()
+
+    def play(self, *args, **kwargs):
+        self._unparkFor(args)
+        result = super().play(*args, **kwargs)
+        self.sweep()
+        return result
+
+    def endSlide(self, *args, **kwargs):
+        super().endSlide(*args, **kwargs)
+        self.sweep()
+
+    def endStage(self) -> None:
+        self.sweep()
+        super().endStage()
+
+    def _unparkFor(self, animations: tuple) -> None:
+        if not self.parked:
+            return
+
+        cameraFrame = getattr(self.camera, "frame", None)
+        touched = set()
+        for animation in animations:
+            mobject = getattr(animation, "mobject", None)
+            if isinstance(mobject, Mobject):
+                touched.update(id(mob) for mob in mobject.get_family())
+
+        # A moving camera can bring anything back into view, and code between plays may have shifted or lit up
+        # a parked mobject directly
+        if cameraFrame is not None and id(cameraFrame) in touched:
+            self.unpark(self.parked)
+        else:
+            self.unpark([mobject for mobject in self.parked
+                         if any(id(mob) in touched for mob in mobject.get_family())
+                         or (_visible(mobject) and not self._offFrame(mobject))])
+
+    def unpark(self, mobjects: List[Mobject]) -> None:
+        # Back in front of the mobject that followed it when it was parked, keeping the drawing order
+        for mobject in list(mobjects):
+            self.parked.remove(mobject)
+            anchor = self._anchor(self.parkedAnchors.pop(id(mobject), None))
+            # The anchor may have been parked itself since, then its own anchor marks the place
+            while anchor is not None and anchor not in self.mobjects and anchor in self.parked:
+                anchor = self._anchor(self.parkedAnchors.get(id(anchor)))
+            if anchor is not None and anchor in self.mobjects:
+                self.mobjects.insert(self.mobjects.index(anchor), mobject)
+            else:
+                self.mobjects.append(mobject)
+
+    @staticmethod
+    def _anchor(reference: Optional[weakref.ref]) -> Optional[Mobject]:
+        return reference() if reference is not None else None
+
+    def _offFrame(self, mobject: Mobject) -> bool:
+        camera = self.camera
+        if not self.sweepOffFrame or isinstance(camera, ThreeDCamera):
+            return False
+
+        points = mobject.get_all_points()
+        if len(points) == 0:
+            return False
+
+        center = camera.frame_center
+        low = points[:, :2].min(axis=0) - center[:2]
+        high = points[:, :2].max(axis=0) - center[:2]
+        halfSize = np.array([camera.frame_width, camera.frame_height]) / 2
+        return bool(np.any(low > halfSize) or np.any(high < -halfSize))
+
+    def sweep(self) -> None:
+        if self.updaters or any(_hasUpdaters(mobject) for mobject in self.mobjects):
+            return
+
+        cameraFrame = getattr(self.camera, "frame", None)
+        detached = []
+
+        for mobject in self.mobjects:
+            if mobject is cameraFrame or isinstance(mobject, self.sweepExempt) or _hasUpdaters(mobject):
+                continue
+            if not mobject.family_members_with_points():
+                continue
+
+            if not _visible(mobject):
+                detached.append((mobject, "transparent"))
+            elif self._offFrame(mobject):
+                detached.append((mobject, "offFrame"))
+
+        if not detached:
+            return
+
+        for mobject, reason in detached:
+            index = self.mobjects.index(mobject)
+            self.mobjects.remove(mobject)
+            self.parked.append(mobject)
+            self.parkedAnchors[id(mobject)] = weakref.ref(self.mobjects[index]) if index < len(self.mobjects) else None
+
+            owner = self.mobjectOwners.get(mobject, "construct")
+            report = self.lifecycleReport[owner]
+            report["swept"][reason] += 1
+            if reason != "offFrame":
+                report["leaked"].append(_describe(mobject))
+
+    def tear_down(self):
+        super().tear_down()
+
+        report = {
+            stage: {"added": entry["added"], "swept": dict(entry["swept"]), "leaked": entry["leaked"],
+                    "remaining": sum(owner == stage for mobject, owner in self.mobjectOwners.items()
+                                     if mobject in self.mobjects)}
+            for stage, entry in self.lifecycleReport.items()
+        }
+
+        directory = Path(config.media_dir) / "lifecycle"
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"{type(self).__name__}.json").write_text(json.dumps(report, indent=2))
+
+        for stage, entry in report.items():
+            if entry["leaked"]:
+                counts = ", ".join(f"{count} {reason}" for reason, count in entry["swept"].items())
+                logger.info(f"Stage {stage} left {len(entry['leaked'])} dead mobjects in the scene ({counts})")
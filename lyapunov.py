@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+from manim import config
+
+from simulation import DoublePendulumEnsemble, Ensemble, LorenzEnsemble
+
+# Builds an ensemble from the two swept initial conditions, the other variables come from params
+systems = {
+    "lorenz": lambda a, b, params: LorenzEnsemble(
+        a, params.get("y", 1.0), b, **{k: v for k, v in params.items() if k != "y"}
+    ),
+    "doublePendulum": lambda a, b, params: DoublePendulumEnsemble(a, b, **params),
+}
+
+
+def largestLyapunov(pair: Ensemble, time: float, dt: float, substeps: int = 1, renormSteps: int = 10,
+                    d0: float = 1e-8) -> np.ndarray:
+    # Two trajectory (Benettin) estimate: the first half of the ensemble is the reference, the second half the
+    # perturbed copy, pulled back to distance d0 every renormSteps steps while the log stretch is accumulated
+    count = len(pair) // 2
+    reference, perturbed = pair.state[:, :count], pair.state[:, count:]
+    perturbed[0] += d0
+
+    total = np.zeros(count)
+    steps = max(int(round(time / dt)), 1)
+
+    for step in range(1, steps + 1):
+        pair.step(dt, substeps)
+        if step % renormSteps and step != steps:
+            continue
+
+        difference = perturbed - reference
+        distance = np.maximum(np.sqrt(np.einsum("ij,ij->j", difference, difference)), np.finfo(float).tiny)
+        total += np.log(distance / d0)
+
+        difference *= d0 / distance
+        np.add(reference, difference, out=perturbed)
+
+    return total / (steps * dt)
+
+
+def _lyapunovChunk(system: str, a: np.ndarray, b: np.ndarray, params: dict, time: float, dt: float,
+                   substeps: int, renormSteps: int, d0: float) -> np.ndarray:
+    pair = systems[system](np.concatenate([a, a]), np.concatenate([b, b]), params)
+    return largestLyapunov(pair, time, dt, substeps, renormSteps, d0)
+
+
+def lyapunovMap(system: str, aRange: Tuple[float, float], bRange: Tuple[float, float], resolution: Tuple[int, int],
+                time: float = 20, dt: float = 0.01, substeps: int = 1, renormSteps: int = 10, d0: float = 1e-8,
+                params: dict = None, workers: int = None, chunkSize: int = 1 << 16,
+                directory: Optional[Path] = None) -> np.ndarray:
+    # Largest exponent for every cell of an (a, b) grid of initial conditions, row per b value so it reads as an
+    # image. Lorenz sweeps (x, z) at fixed y, the double pendulum sweeps (theta_1, theta_2) from rest
+    params = params or {}
+    width, height = resolution
+    directory = directory or Path(config.media_dir) / "lyapunov"
+
+    description = json.dumps([system, aRange, bRange, resolution, time, dt, substeps, renormSteps, d0, params],
+                             sort_keys=True)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{system}_{hashlib.sha256(description.encode()).hexdigest()[:16]}.npy"
+    if path.exists():
+        return np.load(path, mmap_mode="r")
+
+    a, b = np.meshgrid(np.linspace(*aRange, width), np.linspace(*bRange, height))
+    a, b = a.ravel(), b.ravel()
+
+    tempPath = path.with_suffix(f".{os.getpid()}.tmp.npy")
+    result = np.lib.format.open_memmap(tempPath, mode="w+", dtype=np.float32, shape=(height, width))
+    flat = result.reshape(-1)
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = {
+            pool.submit(_lyapunovChunk, system, a[start:start + chunkSize], b[start:start + chunkSize], params, time,
+                        dt, substeps, renormSteps, d0): start
+            for start in range(0, a.size, chunkSize)
+        }
+        for future in as_completed(futures):
+            start = futures[future]
+            values = future.result()
+            flat[start:start + values.size] = values
+
+    result.flush()
+    del result, flat
+    os.replace(tempPath, path)
+    return np.load(path, mmap_mode="r")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Largest Lyapunov exponent over a grid of initial conditions")
+    parser.add_argument("system", choices=list(systems))
+    parser.add_argument("-r", "--resolution", type=int, default=1000)
+    parser.add_argument("-t", "--time", type=float, default=20)
+    parser.add_argument("--dt", type=float, default=0.01)
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    arguments = parser.parse_args()
+
+    ranges = {"lorenz": ((-20, 20), (0, 50)), "doublePendulum": ((-np.pi, np.pi), (-np.pi, np.pi))}
+    values = lyapunovMap(arguments.system, *ranges[arguments.system], (arguments.resolution, arguments.resolution),
+                         time=arguments.time, dt=arguments.dt, workers=arguments.workers)
+    print(f"min {values.min():.4f}, mean {values.mean():.4f}, max {values.max():.4f}")
@@ -4,46 +4,170 @@ from manim_slides import Slide
 from manim_pptx import PPTXScene
 from typing import List
 
+from flipmap import flipMap, flipMapImage
+from lifecycle import LifecycleScene
+from pointcloud import PointCloud, RingTrail
+from pptxexport import StreamingPPTXScene
+from profiling import ProfiledScene
+from rendering import HoldFrameScene, ParallelFrameScene, StaticLayerScene
+from scheduler import UpdaterScheduler, centers, polylinePoints
+from simulation import DoublePendulumEnsemble, LorenzEnsemble
+from stages import StageScene, emptyState, stage
+from texbatch import compileSceneTex
+from texcache import texCache
+from trajstore import trajectoryStore
+
 fontSize = 30
 
 
-def createTexM(string: str, fontS: float = fontSize) -> MathTex:
+def splitTexM(string: str) -> List[str]:
     stringS = string.split("=", 1)
     stringS.insert(1, "=")
-    stringS = stringS[:2] + stringS[2].split("||")
+    return stringS[:2] + stringS[2].split("||")
 
-    return MathTex(*stringS, font_size=fontS)
 
+def createTexM(string: str, fontS: float = fontSize) -> MathTex:
+    return texCache.mathTex(*splitTexM(string), fontS=fontS)
+
+
+def texPartBoxes(tex: MathTex) -> np.ndarray:
+    # (parts, 2, 3) min / max corners, from the same points get_critical_point uses. Parts without points get an
+    # empty box so they drop out of unions
+    boxes = np.empty((len(tex), 2, 3))
+    boxes[:, 0], boxes[:, 1] = np.inf, -np.inf
+    for i, part in enumerate(tex):
+        points = part.get_points_defining_boundary()
+        if len(points):
+            boxes[i] = points.min(axis=0), points.max(axis=0)
+    return boxes
+
+
+def layoutTexM(texs: List[MathTex], startPos, downMultiplier=None, specialAlign: MathTex = None,
+               pageBottom: float = None) -> List[List[MathTex]]:
+    # Places texs exactly like chained next_to / shift / align_to / next_to calls would, but measures every part
+    # once and moves it once. With pageBottom, a line that would end below it starts a new page back at startPos
+    buff = DEFAULT_MOBJECT_TO_MOBJECT_BUFFER
+    startPos = np.array(startPos, dtype=float)
+
+    boxes = [texPartBoxes(tex) for tex in texs]
+    texMin = np.array([box[:, 0].min(axis=0) for box in boxes])
+    texMax = np.array([box[:, 1].max(axis=0) for box in boxes])
+    texCenter = (texMin + texMax) / 2
+
+    # next_to(previous, DOWN * 0.5) centres a line under the previous one, 0.125 below it, then downMultiplier
+    down = np.array([downMultiplier[i] if downMultiplier else 0 for i in range(len(texs) - 1)])
+    steps = np.empty((len(texs), 3))
+    steps[0] = startPos - texCenter[0]
+    steps[1:] = texCenter[:-1] - texCenter[1:]
+    steps[1:, 1] = texMin[:-1, 1] - texMax[1:, 1] - buff * 0.5 - down
+    texShift = np.cumsum(steps, axis=0)
+
+    pages = [0]
+    if pageBottom is not None:
+        offset = 0
+        for i in range(1, len(texs)):
+            if texMin[i, 1] + texShift[i, 1] + offset < pageBottom:
+                offset = startPos[1] - texCenter[i, 1] - texShift[i, 1]
+                pages.append(i)
+            texShift[i, 1] += offset
+
+    # Every "=" shares the left edge of the first one, or of specialAlign's
+    eqMin = np.array([box[1, 0] for box in boxes]) + texShift
+    eqMax = np.array([box[1, 1] for box in boxes]) + texShift
+    alignX = specialAlign[1].get_critical_point(LEFT)[0] if specialAlign else eqMin[0, 0]
+    eqShift = np.zeros_like(texShift)
+    eqShift[:, 0] = alignX - eqMin[:, 0]
+    eqMin += eqShift
+    eqMax += eqShift
+    eqCenter = (eqMin + eqMax) / 2
+
+    # The left side ends buff before the "=", the rest starts buff after it, both centred on it
+    leftMin = np.array([box[0, 0] for box in boxes]) + texShift
+    leftMax = np.array([box[0, 1] for box in boxes]) + texShift
+    leftShift = eqCenter - (leftMin + leftMax) / 2
+    leftShift[:, 0] = eqMin[:, 0] - buff - leftMax[:, 0]
+
+    restMin = np.array([box[2:, 0].min(axis=0, initial=np.inf) for box in boxes]) + texShift
+    restMax = np.array([box[2:, 1].max(axis=0, initial=-np.inf) for box in boxes]) + texShift
+    restShift = eqCenter - (restMin + restMax) / 2
+    restShift[:, 0] = eqMax[:, 0] + buff - restMin[:, 0]
 
-def generateTexM(*sL: str, startPos, fontS: float = fontSize, downMultiplier=None, specialAlign: MathTex = None) -> List[MathTex]:
-    texs = [createTexM(s, fontS) for s in sL]
-    texs[0].move_to(startPos)
-    for i, tex in enumerate(texs[1:]):
-        tex.next_to(texs[i], DOWN * 0.5)
-        tex.shift(DOWN * (downMultiplier[i] if downMultiplier else 0))
-
-    # Align to Previous One
-    texPart2 = [tex[1] for tex in texs]
-    for i, texPart in enumerate(texPart2):
-        if i == 0:
-            if specialAlign:
-                texPart.align_to(specialAlign[1], LEFT)
-        else:
-            texPart.align_to(texPart2[i - 1], LEFT)
+    for i, tex in enumerate(texs):
+        tex[0].shift(texShift[i] + leftShift[i])
+        tex[1].shift(texShift[i] + eqShift[i])
+        if len(tex) > 2 and np.isfinite(restShift[i]).all():
+            for part in tex[2:]:
+                part.shift(texShift[i] + restShift[i])
+
+    return [texs[start:end] for start, end in zip(pages, pages[1:] + [len(texs)])]
 
-    for i in range(len(texs)):
-        texs[i][0].next_to(texPart2[i], LEFT)
-        texs[i][2:].next_to(texPart2[i], RIGHT)
 
+def generateTexM(*sL: str, startPos, fontS: float = fontSize, downMultiplier=None, specialAlign: MathTex = None,
+                 pageBottom: float = None) -> List[MathTex]:
+    texs = [createTexM(s, fontS) for s in sL]
+    layoutTexM(texs, startPos, downMultiplier, specialAlign, pageBottom)
     return texs
 
 
+def paginateTexM(*sL: str, startPos, fontS: float = fontSize, downMultiplier=None, specialAlign: MathTex = None,
+                 pageBottom: float = -config.frame_height / 2 + 0.5) -> List[List[MathTex]]:
+    texs = [createTexM(s, fontS) for s in sL]
+    return layoutTexM(texs, startPos, downMultiplier, specialAlign, pageBottom)
+
+
+def playTexPages(scene: Scene, pages: List[List[MathTex]], lead=None) -> None:
+    # Writes the pages line by line, lead(tex) giving the animations played before each line. A full page ends its
+    # slide and is cleared before the next one, the last page stays for the caller
+    for i, page in enumerate(pages):
+        if i:
+            scene.wait(waitDuration)
+            scene.endSlide()
+            scene.play(*[Unwrite(tex) for tex in pages[i - 1]])
+        for tex in page:
+            if lead is not None:
+                scene.play(*lead(tex))
+            scene.play(Write(tex))
+
+
 def replaceTexM(oldTexM: MathTex, newTexM: MathTex) -> None:
     newTexM[1].move_to(oldTexM[1])
     newTexM[0].next_to(newTexM[1], LEFT)
     newTexM[2:].next_to(newTexM[1], RIGHT)
 
 
+def morphTexM(source: MathTex, target: MathTex, lagRatio: float = 0, copySource: bool = True) -> AnimationGroup:
+    # Every part of target grows out of the source part with the same tex, all in one animation.
+    # Signs and whitespace around a part are ignored, parts without an exact match fall back to the first source
+    # part containing their tex like get_part_by_tex, a source part used twice is copied
+    if copySource:
+        source = source.copy()
+
+    def key(part) -> str:
+        return part.get_tex_string().lstrip("-+ ").rstrip()
+
+    index = {}
+    for part in source:
+        index.setdefault(key(part), []).append(part)
+
+    used = set()
+    animations = []
+    for partA in target:
+        tex = key(partA)
+        candidates = index.get(tex) or [part for part in source if tex in part.get_tex_string()]
+        partB = next((part for part in candidates if id(part) not in used), candidates[0] if candidates else None)
+
+        if partB is None:
+            animations.append(FadeIn(partA))
+            continue
+
+        if id(partB) in used:
+            partB = partB.copy()
+        used.add(id(partB))
+        animations.append(ReplacementTransform(partB, partA))
+
+    return AnimationGroup(*animations, lag_ratio=lagRatio)
+
+
 def generateTexME(*sL: List[str], startPos, fontS: float = fontSize, downMultiplier=None) -> List[MathTex]:
     texs = [MathTex(s, font_size=fontS) for s in sL]
 
@@ -66,9 +190,24 @@ def alignMathTexNum(mathTexs: List[MathTex], firstOffset, fontS: float = fontSiz
     return texs
 
 
+def axesBasis(axes: Axes):
+    # Origin and basis vectors of linear axes, so many coordinates can be mapped with one matrix product
+    origin = np.array(axes.c2p(*np.zeros(axes.dimension)))
+    basis = np.array([np.array(axes.c2p(*unit)) - origin for unit in np.eye(axes.dimension)])
+    return origin, basis
+
+
+texSplitters = {
+    "createTexM": splitTexM,
+    "generateTexM": splitTexM,
+    "paginateTexM": splitTexM,
+    "generateTexME": lambda s: [s],
+}
+
+
 class PPTXSceneFake:
-    def __init__(self):
-        pass
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
 
     def endSlide(self, *args, **kwargs):
         pass
@@ -76,22 +215,36 @@ class PPTXSceneFake:
 
 waitDuration = 0.1
 
+# Lowest a derivation line may reach before it moves on to the next slide
+derivePageBottom = -config.frame_height / 2 + 0.5
+
+lorenzScale = 0.1
+lorenzAxes = [2, 0, 1]
+
 
-class Main(MovingCameraScene, PPTXScene):
+class Main(ProfiledScene, LifecycleScene, StageScene, StreamingPPTXScene, HoldFrameScene, StaticLayerScene,
+           ParallelFrameScene, MovingCameraScene, PPTXScene):
     def __init__(self):
         super().__init__()
         self.destroyLater = []
 
+    def setup(self):
+        super().setup()
+        compileSceneTex(self, texSplitters)
+
     def construct(self):
         # self.titleStage()
         # self.defineStage()
         # self.doublePendulumDerive()
         # self.doublePendulumDerive2(init=False)
+        # self.doublePendulumFlipMap()
+        # self.doublePendulumEnsemble()
         # self.formulas2()
         # self. tester()
         self.lorenzExplain()
         pass
 
+    @stage(initial=emptyState)
     def titleStage(self):
         #  Title
         title = Text("Chaos Theory")
@@ -101,6 +254,7 @@ class Main(MovingCameraScene, PPTXScene):
         self.endSlide()
         self.remove(title)
 
+    @stage(initial=emptyState)
     def defineStage(self):
         title2 = Text("Chaotic Systems")
         title2.to_edge(UP)
@@ -146,6 +300,7 @@ class Main(MovingCameraScene, PPTXScene):
             self.play(ReplacementTransform(circle, num), Write(mainText), run_time=1)
             self.endSlide()
 
+    @stage
     def doublePendulumDerive(self):
         # Deriving via Kinematics
         # Stage 1
@@ -239,32 +394,29 @@ class Main(MovingCameraScene, PPTXScene):
             r"y_1'' = l_1(sin(\theta_1)\theta_1'' + cos(\theta_1)\theta_1' * \theta_1')",
             r"x_2'' = x_1'' + l_2(cos(\theta_2)\theta_2'' - sin(\theta_2)\theta_2' * \theta_2')",
             r"y_2'' = y_1'' + l_2(sin(\theta_2)\theta_2'' + cos(\theta_2)\theta_2' * \theta_2')",
-            startPos=axes.c2p(4, 3.5)
+            startPos=axes.c2p(4, 3.5),
+            pageBottom=derivePageBottom
         )
 
         # Stage 4
-        f1, f2, f3, f4 = generateTexM(
+        positionPages = paginateTexM(
             r"x_1 =  l_1sin(\theta_1)",
             r"y_1 = -l_1cos(\theta_1)",
             r"x_2 = x_1 + l_2sin(\theta_2)",
             r"y_2 = y_1 - l_2cos(\theta_2)",
             startPos=axes.c2p(4, 3.5),
-            specialAlign=fDD1
+            specialAlign=fDD1,
+            pageBottom=derivePageBottom
         )
+        f1, f2, f3, f4 = sum(positionPages, [])
 
         x1C = x1Label.copy()
         y1C = y1Label.copy()
         x2C = x2Label.copy()
         y2C = y2Label.copy()
 
-        self.play(x1C.animate.move_to(f1[0]))
-        self.play(Write(f1))
-        self.play(y1C.animate.move_to(f2[0]))
-        self.play(Write(f2))
-        self.play(x2C.animate.move_to(f3[0]))
-        self.play(Write(f3))
-        self.play(y2C.animate.move_to(f4[0]))
-        self.play(Write(f4))
+        labelCopies = {f1: x1C, f2: y1C, f3: x2C, f4: y2C}
+        playTexPages(self, positionPages, lambda tex: [labelCopies[tex].animate.move_to(tex[0])])
 
         self.remove(x1C, x2C, y1C, y2C)
         # self.wait(waitDuration)
@@ -277,7 +429,8 @@ class Main(MovingCameraScene, PPTXScene):
             r"x_2' = x_1' + l_2cos(\theta_2) * \theta_2'",
             r"y_2' = y_1' + l_2sin(\theta_2) * \theta_2'",
             startPos=axes.c2p(4, 3.5),
-            specialAlign=fDD1
+            specialAlign=fDD1,
+            pageBottom=derivePageBottom
         )
 
         fD1r, fD2r, fD3r, fD4r = generateTexM(
@@ -286,7 +439,8 @@ class Main(MovingCameraScene, PPTXScene):
             r"x_2' = x_1' + l_2\theta_2cos(\theta_2)",
             r"y_2' = y_1' + l_2\theta_2'sin(\theta_2)",
             startPos=axes.c2p(4, 3.5),
-            specialAlign=fDD1
+            specialAlign=fDD1,
+            pageBottom=derivePageBottom
         )
 
         self.play(ReplacementTransform(f1, fD1))
@@ -312,7 +466,8 @@ class Main(MovingCameraScene, PPTXScene):
             r"x_2'' = x_1'' + l_2(\theta_2''cos(\theta_2) - \theta_2'^2sin(\theta_2))",
             r"y_2'' = y_1'' + l_2(\theta_2''sin(\theta_2) + \theta_2'^2)cos(\theta_2)",
             startPos=axes.c2p(4, 3.5),
-            specialAlign=fDD1
+            specialAlign=fDD1,
+            pageBottom=derivePageBottom
         )
 
         fDD1rr, fDD2rr, fDD3rr, fDD4rr = generateTexM(
@@ -321,7 +476,8 @@ class Main(MovingCameraScene, PPTXScene):
             r"x_2'' = x_1'' - \theta_2'^2l_2sin(\theta_2) + \theta_2''l_2cos(\theta_2) ",
             r"y_2'' = y_1'' + \theta_2'^2l_2cos(\theta_2) + \theta_2''l_2sin(\theta_2)",
             startPos=axes.c2p(4, 3.5),
-            specialAlign=fDD1
+            specialAlign=fDD1,
+            pageBottom=derivePageBottom
         )
 
         self.play(ReplacementTransform(fD1r, fDD1))
@@ -358,6 +514,7 @@ class Main(MovingCameraScene, PPTXScene):
 
         self.destroyLater += [axes, pivotLabel, line1, line2, firstPendulum, secondPendulum]
 
+    @stage
     def doublePendulumDerive2(self, init: bool = True):
         fontSize = 30
 
@@ -551,6 +708,88 @@ class Main(MovingCameraScene, PPTXScene):
         self.wait(waitDuration)
         self.endSlide()
 
+    @stage
+    def doublePendulumFlipMap(self, resolution: int = 1024, maxTime: float = 10):
+        # Tiles are cached under media/flipmap, so only the first render pays for the sweep
+        times = flipMap(resolution=(resolution, resolution), maxTime=maxTime)
+
+        image = ImageMobject(flipMapImage(times, maxTime))
+        image.height = config.frame_height * 0.75
+        image.shift(DOWN * 0.3)
+
+        title = Tex("Time until either arm flips", font_size=fontSize).to_edge(UP)
+        theta1Label = MathTex(r"\theta_1", font_size=fontSize).next_to(image, DOWN)
+        theta2Label = MathTex(r"\theta_2", font_size=fontSize).next_to(image, LEFT)
+
+        self.play(Write(title))
+        self.play(FadeIn(image), Write(theta1Label), Write(theta2Label))
+        self.wait(waitDuration)
+        self.endSlide()
+
+        self.play(FadeOut(image), Unwrite(title), Unwrite(theta1Label), Unwrite(theta2Label))
+
+    @stage
+    def doublePendulumEnsemble(self, count: int = 100000, shown: int = 200, duration: float = 10,
+                               substeps: int = 4):
+        # Fans theta_1 out by a tiny amount per pendulum, only a spread out subset of the ensemble is drawn
+        ensemble = DoublePendulumEnsemble.spread(count, startAngle1=PI / 2, startAngle2=PI / 2, angleDelta=1e-9,
+                                                 l1=1.5, l2=1.5)
+
+        axes = Axes(axis_config={"tip_shape": StealthTip})
+        pivot = Dot(ORIGIN, radius=0.1, color=YELLOW)
+        title = Tex(f"{count} double pendulums", font_size=fontSize).to_corner(UL)
+
+        shownIndex = np.linspace(0, count - 1, shown).astype(int)
+        colours = color_gradient([BLUE, GREEN, YELLOW, RED], shown)
+
+        # Only the drawn pendulums' angles are kept per frame, a re-render reads them back instead of integrating
+        frameRate = config.frame_rate
+        trajectory = trajectoryStore.record(
+            ensemble, int(duration * frameRate), 1 / frameRate, substeps,
+            view=lambda e: e.state[:2, shownIndex], extra={"shown": shown}
+        )
+
+        origin, basis = axesBasis(axes)
+        frameCorners = [None]
+
+        def corners(time: float) -> np.ndarray:
+            x1, y1, x2, y2 = ensemble.positions(*trajectory.frameAt(time))
+            joints = origin + np.stack([x1, y1], axis=1) @ basis
+            ends = origin + np.stack([x2, y2], axis=1) @ basis
+            return np.stack([np.broadcast_to(pivot.get_center(), joints.shape), joints, ends], axis=1)
+
+        start = corners(0)
+        arms = VGroup(*[
+            VMobject(stroke_color=colour, stroke_width=2, stroke_opacity=0.6).set_points_as_corners(armCorners)
+            for colour, armCorners in zip(colours, start)
+        ])
+        bobs = VGroup(*[Dot(armCorners[2], radius=0.05, color=colour) for colour, armCorners in zip(colours, start)])
+
+        # Every arm and every bob moves through one array update per frame
+        def moveArms(points: np.ndarray, dt: float):
+            frameCorners[0] = corners(scheduler.time)
+            points[...] = polylinePoints(frameCorners[0])
+
+        def moveBobs(points: np.ndarray, dt: float):
+            points += (frameCorners[0][:, 2] - centers(points))[:, None, :]
+
+        self.play(Create(axes), Create(pivot), Write(title))
+        self.play(Create(arms), FadeIn(bobs))
+        self.wait(waitDuration)
+        self.endSlide()
+
+        scheduler = UpdaterScheduler().attach(self)
+        scheduler.register(arms, moveArms)
+        scheduler.register(bobs, moveBobs)
+        self.wait(duration)
+        self.remove(scheduler)
+
+        self.wait(waitDuration)
+        self.endSlide()
+
+        self.play(FadeOut(axes), FadeOut(pivot), FadeOut(title), FadeOut(arms), FadeOut(bobs))
+
+    @stage
     def formulas(self):
         downMultiplier = [0, 0, 0, 0.2, 0, 0.2, 0, 0.2, 0, 0.2, 0, 0.2, 0]
 
@@ -719,10 +958,7 @@ class Main(MovingCameraScene, PPTXScene):
         )
 
 
-        f9Copy = f9Ar.copy()
-        for partA in f9Arr:
-            partB = f9Copy.get_part_by_tex(partA.get_tex_string().lstrip("-+ "))
-            self.play(ReplacementTransform(partB, partA))
+        self.play(morphTexM(f9Ar, f9Arr, lagRatio=1))
         self.play(Create(formulaNumbers[6]))
 
 
@@ -734,10 +970,7 @@ class Main(MovingCameraScene, PPTXScene):
         )
 
 
-        f10Copy = f10Ar.copy()
-        for partA in f10Arr:
-            partB = f10Copy.get_part_by_tex(partA.get_tex_string().lstrip("-+ "))
-            self.play(ReplacementTransform(partB, partA))
+        self.play(morphTexM(f10Ar, f10Arr, lagRatio=1))
         self.play(Write(formulaNumbers[7]))
 
         self.play(ReplacementTransform(f10Arr, f10Arrr))
@@ -750,16 +983,10 @@ class Main(MovingCameraScene, PPTXScene):
         self.play(f12.animate.move_to(formulasTex[9]), Write(formulaNumbers[9]))
         self.play(ReplacementTransform(f12, f12r))
 
-        f11rCopy = f11r.copy()
-        for partA in f11rr:
-            partB = f11rCopy.get_part_by_tex(partA.get_tex_string().lstrip("-+ ").rstrip())
-            self.play(ReplacementTransform(partB, partA))
+        self.play(morphTexM(f11r, f11rr, lagRatio=1))
         self.play(Write(formulaNumbers[10]))
 
-        f12rCopy = f12r.copy()
-        for partA in f12rr:
-            partB = f12rCopy.get_part_by_tex(partA.get_tex_string().lstrip("-+ ").rstrip())
-            self.play(ReplacementTransform(partB, partA))
+        self.play(morphTexM(f12r, f12rr, lagRatio=1))
         self.play(Write(formulaNumbers[11]))
         self.play(ReplacementTransform(f12rr, f12rrr))
         self.play(ReplacementTransform(f12rrr, f12rrrr))
@@ -814,6 +1041,7 @@ class Main(MovingCameraScene, PPTXScene):
 
         self.play(Write(mainFormula2))
 
+    @stage
     def formulas2(self):
         downMultiplier = [0, 0, 0, 0.2, 0, 0.2, 0, 0.2, 0, 0.2, 0, 0.2, 0]
         formulasTex = generateTexM(
@@ -871,9 +1099,11 @@ class Main(MovingCameraScene, PPTXScene):
             self.wait(waitDuration)
             self.endSlide()
 
+    @stage
     def tester(self):
         pass
 
+    @stage
     def lorenzExplain(self):
         square = Square(stroke_width=0)
         heater = Text("Heater")
@@ -916,7 +1146,12 @@ class Main(MovingCameraScene, PPTXScene):
 
         self.wait()
 
-class Main3D(ThreeDScene, PPTXScene):
+class Main3D(ProfiledScene, LifecycleScene, StageScene, StreamingPPTXScene, HoldFrameScene, StaticLayerScene,
+             ParallelFrameScene, ThreeDScene, PPTXScene):
+    def setup(self):
+        super().setup()
+        compileSceneTex(self, texSplitters)
+
     def construct(self):
         axes = ThreeDAxes()
 
@@ -976,4 +1211,49 @@ class Main3D(ThreeDScene, PPTXScene):
 
             self.wait(waitDuration*2)
             self.endSlide()
+
+        self.lorenzEnsemble(axes)
         self.wait(2)
+
+    @stage
+    def lorenzEnsemble(self, axes: ThreeDAxes, count: int = 10000, duration: float = 10, substeps: int = 10,
+                       trailLength: int = 30):
+        ensemble = LorenzEnsemble.grid(count, xSplit=20, ySplit=20, zSplit=400, xDiff=0.01, initX=1, initY=1,
+                                       initZ=1)
+        origin, basis = axesBasis(axes)
+
+        frameRate = config.frame_rate
+        trajectory = trajectoryStore.record(ensemble, int(duration * frameRate), 1 / frameRate, substeps,
+                                            view=LorenzEnsemble.positions)
+        elapsed = [0.0]
+
+        # Hue by index like the Unity LorenzSystem script
+        hues = np.linspace(0, 1, count, endpoint=False)
+        colours = np.clip(np.abs((hues[:, None] * 6 + [0, 4, 2]) % 6 - 3) - 1, 0, 1)
+        dots = PointCloud(np.zeros((count, 3)), colours, pointSize=3)
+        trails = RingTrail(count, trailLength, colours * 0.8, pointSize=1)
+
+        def place(mob, dt=0):
+            elapsed[0] += dt
+
+            # Axis labels read z, x, y, so the Lorenz coordinates are reordered before mapping
+            dots.setPositions(origin + (trajectory.frameAt(elapsed[0])[:, lorenzAxes] * lorenzScale) @ basis)
+            if dt:
+                trails.append(dots.points)
+
+        place(dots)
+
+        self.add(trails)
+        self.play(FadeIn(dots))
+        self.wait(waitDuration)
+        self.endSlide()
+
+        dots.add_updater(place)
+        self.begin_ambient_camera_rotation(rate=0.1)
+        self.wait(duration)
+        self.stop_ambient_camera_rotation()
+        dots.remove_updater(place)
+        self.remove(trails)
+
+        self.wait(waitDuration)
+        self.endSlide()
@@ -0,0 +1,102 @@
+from typing import Sequence
+
+import numpy as np
+from manim import BLACK, PMobject, WHITE, color_to_rgb, color_to_rgba
+
+
+def coloursToRgbas(colours, count: int, opacity: float = 1.0) -> np.ndarray:
+    # Accepts one colour, a list of manim colours or an (N, 3) / (N, 4) array of floats in [0, 1]
+    if isinstance(colours, np.ndarray) and colours.ndim == 2:
+        rgbas = np.empty((count, 4))
+        rgbas[:, :colours.shape[1]] = colours
+        if colours.shape[1] == 3:
+            rgbas[:, 3] = opacity
+        return rgbas
+
+    if isinstance(colours, Sequence) and not isinstance(colours, str):
+        return np.array([color_to_rgba(colour, opacity) for colour in colours])
+
+    return np.tile(color_to_rgba(colours, opacity), (count, 1))
+
+
+class PointCloud(PMobject):
+    # Every point lives in one contiguous (N, 3) positions array with an (N, 4) colour array beside it, no
+    # submobject per point. Cairo draws it through its vectorized point cloud path, in 2D and ThreeDScene alike
+
+    def __init__(self, positions: np.ndarray, colours=WHITE, opacity: float = 1.0, pointSize: float = 4, **kwargs):
+        self.pointSize = pointSize
+        super().__init__(stroke_width=pointSize, **kwargs)
+
+        positions = np.asarray(positions, dtype=float)
+        self.points = positions.copy()
+        self.rgbas = coloursToRgbas(colours, len(positions), opacity)
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def setPositions(self, positions: np.ndarray) -> "PointCloud":
+        # One array assignment per frame, reusing the existing buffer when the count is unchanged
+        if positions.shape == self.points.shape:
+            self.points[...] = positions
+        else:
+            self.points = np.array(positions, dtype=float)
+        return self
+
+    def setColours(self, colours, opacity: float = 1.0) -> "PointCloud":
+        self.rgbas = coloursToRgbas(colours, len(self.points), opacity)
+        return self
+
+    def setOpacities(self, opacities) -> "PointCloud":
+        self.rgbas[:, 3] = opacities
+        return self
+
+
+class RingTrail(PointCloud):
+    # Fixed capacity history of an ensemble's positions, one ring buffer slot per appended frame. Old slots are
+    # overwritten, so the drawn point count and the per frame cost stop growing once the buffer is full.
+    # Cairo writes point colours without blending, so fading is done by mixing towards the background colour
+
+    def __init__(self, count: int, capacity: int, colours=WHITE, pointSize: float = 2, background=BLACK, **kwargs):
+        super().__init__(np.zeros((0, 3)), pointSize=pointSize, **kwargs)
+
+        self.capacity = capacity
+        self.buffer = np.zeros((capacity, count, 3))
+        self.shades = np.ones((capacity, count, 4))
+        self.colours = coloursToRgbas(colours, count)[:, :3]
+        self.background = np.asarray(color_to_rgb(background))
+
+        self.head = 0
+        self.filled = 0
+
+    def append(self, positions: np.ndarray) -> "RingTrail":
+        # positions is (count, 3), one point per trajectory
+        self.buffer[self.head] = positions
+        self.head = (self.head + 1) % self.capacity
+        self.filled = min(self.filled + 1, self.capacity)
+        return self._refresh()
+
+    def extend(self, frames: np.ndarray) -> "RingTrail":
+        # Several frames at once, e.g. every substep of a simulation step
+        for positions in frames[-self.capacity:]:
+            self.buffer[self.head] = positions
+            self.head = (self.head + 1) % self.capacity
+            self.filled = min(self.filled + 1, self.capacity)
+        return self._refresh()
+
+    def clear(self) -> "RingTrail":
+        self.head = 0
+        self.filled = 0
+        return self._refresh()
+
+    def _refresh(self) -> "RingTrail":
+        # Until the buffer wraps, the filled slots are exactly the first self.filled ones
+        ages = (self.head - 1 - np.arange(self.filled)) % self.capacity
+        fade = 1 - ages / self.capacity
+
+        shades = self.shades[:self.filled]
+        np.multiply(self.colours - self.background, fade[:, None, None], out=shades[..., :3])
+        shades[..., :3] += self.background
+
+        self.points = self.buffer[:self.filled].reshape(-1, 3)
+        self.rgbas = shades.reshape(-1, 4)
+        return self
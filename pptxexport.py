@@ -0,0 +1,489 @@
+import hashlib
+import io
+import json
+import os
+import posixpath
+import shutil
+import subprocess
+import time
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from lxml import etree
+from manim import config, logger
+from manim_pptx import PPTXScene
+from pptx import Presentation
+from pptx.opc.constants import RELATIONSHIP_TYPE
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import nsdecls, qn
+from pptx.util import Emu
+
+# Starts the video as soon as the slide shows, instead of waiting for a click on it
+autoplayTiming = """<p:timing {ns}><p:tnLst><p:par><p:cTn id="1" dur="indefinite" restart="never" nodeType="tmRoot">
+<p:childTnLst><p:seq concurrent="1" nextAc="seek"><p:cTn id="2" dur="indefinite" nodeType="mainSeq"><p:childTnLst>
+<p:par><p:cTn id="3" fill="hold"><p:stCondLst><p:cond delay="indefinite"/><p:cond evt="onBegin" delay="0">
+<p:tn val="2"/></p:cond></p:stCondLst><p:childTnLst><p:par><p:cTn id="4" fill="hold"><p:stCondLst>
+<p:cond delay="0"/></p:stCondLst><p:childTnLst><p:par><p:cTn id="5" presetID="1" presetClass="mediacall"
+presetSubtype="0" fill="hold" nodeType="afterEffect"><p:stCondLst><p:cond delay="0"/></p:stCondLst><p:childTnLst>
+<p:cmd type="call" cmd="playFrom(0.0)"><p:cBhvr><p:cTn id="6" dur="{duration}" fill="hold"/><p:tgtEl>
+<p:spTgt spid="{shape}"/></p:tgtEl></p:cBhvr></p:cmd></p:childTnLst></p:cTn></p:par></p:childTnLst></p:cTn></p:par>
+</p:childTnLst></p:cTn></p:par></p:childTnLst></p:cTn><p:prevCondLst><p:cond evt="onPrev" delay="0"><p:tgtEl>
+<p:sldTgt/></p:tgtEl></p:cond></p:prevCondLst><p:nextCondLst><p:cond evt="onNext" delay="0"><p:tgtEl><p:sldTgt/>
+</p:tgtEl></p:cond></p:nextCondLst></p:seq><p:video><p:cMediaNode vol="80000"><p:cTn id="7" {repeat}fill="hold"
+display="0"><p:stCondLst><p:cond delay="indefinite"/></p:stCondLst></p:cTn><p:tgtEl><p:spTgt spid="{shape}"/>
+</p:tgtEl></p:cMediaNode></p:video></p:childTnLst></p:cTn></p:par></p:tnLst></p:timing>"""
+
+contentTypesNamespace = "http://schemas.openxmlformats.org/package/2006/content-types"
+relationshipsNamespace = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+
+def _ffmpeg(*arguments: str) -> None:
+    subprocess.run(["ffmpeg", "-y", "-loglevel", "error", *arguments], check=True)
+
+
+def mediaDuration(path: Path) -> float:
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", str(path)],
+        capture_output=True, text=True, check=True
+    )
+    return float(result.stdout.strip() or 0)
+
+
+def concatVideos(files: List[Path], output: Path) -> Path:
+    # Partial movies share codec and resolution, so they are joined without re-encoding
+    if len(files) == 1:
+        shutil.copyfile(files[0], output)
+        return output
+
+    listFile = output.with_suffix(".txt")
+    listFile.write_text("".join(f"file '{Path(file).resolve().as_posix()}'\n" for file in files))
+    _ffmpeg("-f", "concat", "-safe", "0", "-i", str(listFile), "-c", "copy", str(output))
+    listFile.unlink()
+    return output
+
+
+def extractFrame(video: Path, output: Path, last: bool = False) -> Path:
+    seek = ["-sseof", "-0.1"] if last else []
+    _ffmpeg(*seek, "-i", str(video), "-frames:v", "1", "-update", "1", str(output))
+    return output
+
+
+class SlideMediaCache:
+    # Joined video, poster frame and duration of every slide, keyed by the partial movies the slide was made of.
+    # Manim names cached partial movies after the hash of the animation, its mobjects and the camera, and reuses
+    # the file when nothing changed, so an unchanged slide keeps its key and is never joined or probed again
+    def __init__(self, directory: Optional[Path] = None, maxBytes: int = 4 * 1024 ** 3,
+                 maxAge: float = 30 * 24 * 3600):
+        self._directory = directory
+        self.maxBytes = maxBytes
+        self.maxAge = maxAge
+
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def directory(self) -> Path:
+        directory = self._directory or Path(config.media_dir) / "slidecache"
+        directory.mkdir(parents=True, exist_ok=True)
+        return directory
+
+    @staticmethod
+    def key(files: List[Path]) -> str:
+        digest = hashlib.sha256()
+        digest.update(repr((config.pixel_width, config.pixel_height, config.frame_rate)).encode())
+        for file in files:
+            stat = file.stat()
+            digest.update(f"{file.resolve().as_posix()}|{stat.st_size}|{stat.st_mtime_ns}\n".encode())
+        return digest.hexdigest()
+
+    def media(self, files: List[Path]) -> dict:
+        key = self.key(files)
+        entry = self.directory / key
+        metaPath = entry / "meta.json"
+
+        if metaPath.exists():
+            self.hits += 1
+            # The modification time doubles as the last access time for eviction
+            os.utime(entry)
+        else:
+            self.misses += 1
+            tempEntry = self.directory / f"{key}.{os.getpid()}.tmp"
+            shutil.rmtree(tempEntry, ignore_errors=True)
+            tempEntry.mkdir()
+
+            video = concatVideos(files, tempEntry / "slide.mp4")
+            extractFrame(video, tempEntry / "poster.png")
+            extractFrame(video, tempEntry / "last.png", last=True)
+            (tempEntry / "meta.json").write_text(json.dumps({"duration": mediaDuration(video),
+                                                              "files": [str(file) for file in files]}))
+
+            if entry.exists():
+                shutil.rmtree(tempEntry)
+            else:
+                os.replace(tempEntry, entry)
+
+        meta = json.loads(metaPath.read_text())
+        return {"video": entry / "slide.mp4", "poster": entry / "poster.png", "last": entry / "last.png",
+                "duration": meta["duration"]}
+
+    def evict(self) -> None:
+        # Drops entries unused for maxAge, then the least recently used ones until the cache fits in maxBytes
+        now = time.time()
+        entries = []
+        for entry in self.directory.iterdir():
+            if not entry.is_dir():
+                continue
+
+            used = entry.stat().st_mtime
+            if now - used > self.maxAge or entry.name.endswith(".tmp"):
+                shutil.rmtree(entry, ignore_errors=True)
+                continue
+
+            entries.append((used, sum(file.stat().st_size for file in entry.iterdir()), entry))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.maxBytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+
+class SlideDeck:
+    # Presentation of full slide videos, sized to the render's aspect ratio
+    def __init__(self, width: int = None, height: int = None):
+        width = width or config.pixel_width
+        height = height or config.pixel_height
+
+        self.presentation = Presentation()
+        self.presentation.slide_width = Emu(12192000)
+        self.presentation.slide_height = Emu(round(12192000 * height / width))
+        self.layout = self.presentation.slide_layouts[6]
+
+    def __len__(self) -> int:
+        return len(self.presentation.slides)
+
+    def _slide(self, notes: str = None):
+        slide = self.presentation.slides.add_slide(self.layout)
+        if notes:
+            slide.notes_slide.notes_text_frame.text = notes
+        return slide
+
+    @staticmethod
+    def _advance(slide, autonext: bool) -> None:
+        # Goes to the next slide once the video has finished instead of waiting for a click
+        if autonext:
+            transition = parse_xml(f'<p:transition {nsdecls("p")} advTm="0"/>')
+            slide._element.find(qn("p:clrMapOvr")).addnext(transition)
+
+    def addVideo(self, media: dict, loop: bool = False, autonext: bool = False, notes: str = None):
+        slide = self._slide(notes)
+        movie = slide.shapes.add_movie(str(media["video"]), 0, 0, self.presentation.slide_width,
+                                       self.presentation.slide_height, poster_frame_image=str(media["poster"]),
+                                       mime_type="video/mp4")
+
+        timing = slide._element.find(qn("p:timing"))
+        if timing is not None:
+            slide._element.remove(timing)
+        slide._element.append(parse_xml(autoplayTiming.format(
+            ns=nsdecls("p"), shape=movie.shape_id, duration=max(int(media["duration"] * 1000), 1),
+            repeat='repeatCount="indefinite" ' if loop else ""
+        )))
+
+        self._advance(slide, autonext and not loop)
+        return slide
+
+    def addPicture(self, image: Path, autonext: bool = False, notes: str = None):
+        # Slides without animations hold the previous slide's last frame
+        slide = self._slide(notes)
+        slide.shapes.add_picture(str(image), 0, 0, self.presentation.slide_width, self.presentation.slide_height)
+        self._advance(slide, autonext)
+        return slide
+
+    def save(self, path: Path) -> Path:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.presentation.save(str(path))
+        return path
+
+
+class CachedPPTXScene:
+    # Mixin replacing PPTXScene's export, goes before the scene base. Every slide's media comes from the
+    # SlideMediaCache, so a rebuild only joins and probes the slides whose animations changed
+    def __init__(self, *args, **kwargs):
+        self.slideRanges = []
+        self.slideOptions = []
+        self.slideMediaCache = SlideMediaCache()
+        super().__init__(*args, **kwargs)
+
+    def _partialFiles(self) -> list:
+        return getattr(self.renderer.file_writer, "partial_movie_files", [])
+
+    def endSlide(self, loop: bool = False, autonext: bool = False, notes: str = None, shownextnotes: bool = False):
+        super().endSlide(loop=loop, autonext=autonext, notes=notes, shownextnotes=shownextnotes)
+
+        start = self.slideRanges[-1][1] if self.slideRanges else 0
+        self.slideRanges.append((start, len(self._partialFiles())))
+        self.slideOptions.append({"loop": loop, "autonext": autonext, "notes": notes, "shownextnotes": shownextnotes})
+
+    def deckOptions(self, index: int) -> dict:
+        # With shownextnotes the presenter also sees what the next slide is about
+        options = self.slideOptions[index]
+        notes = options["notes"]
+        if options["shownextnotes"] and index + 1 < len(self.slideOptions):
+            nextNotes = self.slideOptions[index + 1]["notes"]
+            if nextNotes:
+                notes = f"{notes}\n\nNext: {nextNotes}" if notes else f"Next: {nextNotes}"
+        return {"loop": options["loop"], "autonext": options["autonext"], "notes": notes}
+
+    def slideFiles(self, start: int, end: int) -> List[Path]:
+        # Animations skipped by manim leave no file behind
+        return [Path(file) for file in self._partialFiles()[start:end] if file is not None]
+
+    def slideMedia(self, index: int) -> Optional[dict]:
+        files = self.slideFiles(*self.slideRanges[index])
+        return self.slideMediaCache.media(files) if files else None
+
+    def presentationPath(self) -> Path:
+        return Path(getattr(self, "output_folder", "pptx")) / f"{type(self).__name__}.pptx"
+
+    def render(self, *args, **kwargs):
+        # Everything up to PPTXScene renders as usual, PPTXScene's own export is replaced by exportPresentation
+        result = super(PPTXScene, self).render(*args, **kwargs)
+        if config.write_to_movie and self.slideRanges:
+            self.exportPresentation()
+        return result
+
+    def exportPresentation(self) -> Path:
+        deck = SlideDeck()
+        previous = None
+        for index in range(len(self.slideOptions)):
+            options = self.deckOptions(index)
+            media = self.slideMedia(index)
+            if media is not None:
+                deck.addVideo(media, **options)
+                previous = media
+            elif previous is not None:
+                deck.addPicture(previous["last"], options.get("autonext", False), options.get("notes"))
+
+        self.slideMediaCache.evict()
+        path = deck.save(self.presentationPath())
+
+        cache = self.slideMediaCache
+        logger.info(f"Wrote {len(deck)} slides to {path}, {cache.hits} reused and {cache.misses} rebuilt")
+        return path
+
+
+def _package(deck: SlideDeck) -> Dict[str, bytes]:
+    buffer = io.BytesIO()
+    deck.presentation.save(buffer)
+    with zipfile.ZipFile(buffer) as package:
+        return {name: package.read(name) for name in package.namelist()}
+
+
+def _relsName(part: str) -> str:
+    directory, name = posixpath.split(part)
+    return posixpath.join(directory, "_rels", f"{name}.rels")
+
+
+def _targets(relationships, part: str):
+    for relationship in relationships:
+        if relationship.get("TargetMode") != "External":
+            yield relationship, posixpath.normpath(posixpath.join(posixpath.dirname(part), relationship.get("Target")))
+
+
+def _slideParts(parts: Dict[str, bytes], slide: str) -> List[str]:
+    # The slide with its notes and media, without following into the shared layouts and masters
+    found = []
+    pending = [slide]
+    while pending:
+        part = pending.pop()
+        if part in found:
+            continue
+
+        found.append(part)
+        if _relsName(part) in parts:
+            found.append(_relsName(part))
+            pending += [target for _, target in _targets(etree.fromstring(parts[_relsName(part)]), part)
+                        if target in parts and target.startswith(("ppt/media/", "ppt/notesSlides/"))]
+
+    return found
+
+
+class StreamingDeck:
+    # A pptx written slide by slide. The three parts listing the slides are always the last entries of the zip:
+    # appending a slide truncates them away, adds the slide's own parts and writes them again, so the file on
+    # disk is a complete presentation after every slide
+    mutableParts = ("[Content_Types].xml", "ppt/presentation.xml", "ppt/_rels/presentation.xml.rels")
+
+    def __init__(self, path: Path, width: int = None, height: int = None):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.slideCount = 0
+
+        # A throwaway slide with notes makes python-pptx include the notes master, then the slide is dropped
+        deck = SlideDeck(width, height)
+        deck._slide(notes=" ")
+        parts = _package(deck)
+        for part in _slideParts(parts, "ppt/slides/slide1.xml"):
+            del parts[part]
+
+        types = etree.fromstring(parts["[Content_Types].xml"])
+        self.defaults = {entry.get("Extension"): entry.get("ContentType")
+                         for entry in types if entry.tag.endswith("Default")}
+        self.overrides = {entry.get("PartName"): entry.get("ContentType")
+                          for entry in types if entry.tag.endswith("Override") and entry.get("PartName")[1:] in parts}
+
+        self.presentationXml = etree.fromstring(parts["ppt/presentation.xml"])
+        slideList = self.presentationXml.find(qn("p:sldIdLst"))
+        if slideList is not None:
+            self.presentationXml.remove(slideList)
+
+        self.presentationRels = etree.fromstring(parts["ppt/_rels/presentation.xml.rels"])
+        for relationship in list(self.presentationRels):
+            if relationship.get("Type") == RELATIONSHIP_TYPE.SLIDE:
+                self.presentationRels.remove(relationship)
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as package:
+            for name, data in parts.items():
+                if name not in self.mutableParts:
+                    package.writestr(name, data)
+            self._writeMutable(package)
+
+    def __len__(self) -> int:
+        return self.slideCount
+
+    def append(self, deck: SlideDeck) -> None:
+        # deck holds exactly one slide, built with SlideDeck.addVideo or addPicture
+        number = self.slideCount + 1
+        parts = _package(deck)
+        slideParts = [part for part in _slideParts(parts, "ppt/slides/slide1.xml") if "/_rels/" not in part]
+
+        renamed = {}
+        for part in slideParts:
+            directory, name = posixpath.split(part)
+            if directory == "ppt/slides":
+                renamed[part] = f"ppt/slides/slide{number}.xml"
+            elif directory == "ppt/notesSlides":
+                renamed[part] = f"ppt/notesSlides/notesSlide{number}.xml"
+            else:
+                renamed[part] = f"{directory}/slide{number}_{name}"
+
+        entries = {}
+        for part, newPart in renamed.items():
+            entries[newPart] = parts[part]
+            if _relsName(part) not in parts:
+                continue
+
+            relationships = etree.fromstring(parts[_relsName(part)])
+            for relationship, target in _targets(relationships, part):
+                if target in renamed:
+                    relationship.set("Target", posixpath.relpath(renamed[target], posixpath.dirname(newPart)))
+            entries[_relsName(newPart)] = etree.tostring(relationships, xml_declaration=True, encoding="UTF-8",
+                                                         standalone=True)
+
+        types = etree.fromstring(parts["[Content_Types].xml"])
+        for entry in types:
+            if entry.tag.endswith("Default"):
+                self.defaults.setdefault(entry.get("Extension"), entry.get("ContentType"))
+            elif entry.get("PartName")[1:] in renamed:
+                self.overrides["/" + renamed[entry.get("PartName")[1:]]] = entry.get("ContentType")
+
+        with zipfile.ZipFile(self.path, "a", zipfile.ZIP_DEFLATED) as package:
+            self._dropMutable(package)
+            for name, data in entries.items():
+                # Video and images are compressed already
+                stored = name.startswith("ppt/media/")
+                package.writestr(name, data, zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED)
+
+            self.slideCount = number
+            self._writeMutable(package)
+
+    def _dropMutable(self, package: zipfile.ZipFile) -> None:
+        infos = [package.NameToInfo.pop(name) for name in self.mutableParts]
+        package.filelist = [info for info in package.filelist if info not in infos]
+
+        offset = min(info.header_offset for info in infos)
+        package.fp.seek(offset)
+        package.fp.truncate()
+        package.start_dir = offset
+
+    def _writeMutable(self, package: zipfile.ZipFile) -> None:
+        types = etree.Element(f"{{{contentTypesNamespace}}}Types", nsmap={None: contentTypesNamespace})
+        for extension, contentType in self.defaults.items():
+            etree.SubElement(types, f"{{{contentTypesNamespace}}}Default", Extension=extension,
+                             ContentType=contentType)
+        for partName, contentType in self.overrides.items():
+            etree.SubElement(types, f"{{{contentTypesNamespace}}}Override", PartName=partName,
+                             ContentType=contentType)
+
+        relationships = etree.fromstring(etree.tostring(self.presentationRels))
+        presentation = etree.fromstring(etree.tostring(self.presentationXml))
+        slideList = parse_xml(f"<p:sldIdLst {nsdecls('p', 'r')}/>")
+        for number in range(1, self.slideCount + 1):
+            etree.SubElement(relationships, f"{{{relationshipsNamespace}}}Relationship", Id=f"rIdSlide{number}",
+                             Type=RELATIONSHIP_TYPE.SLIDE, Target=f"slides/slide{number}.xml")
+            etree.SubElement(slideList, qn("p:sldId"), {"id": str(255 + number), qn("r:id"): f"rIdSlide{number}"})
+        presentation.find(qn("p:sldSz")).addprevious(slideList)
+
+        for name, element in zip(self.mutableParts, (types, presentation, relationships)):
+            package.writestr(name, etree.tostring(element, xml_declaration=True, encoding="UTF-8", standalone=True))
+
+
+class StreamingPPTXScene(CachedPPTXScene):
+    # Adds every slide to the pptx as soon as endSlide closes it, so only the slide being joined has temporary
+    # files and an interrupted render still leaves an openable deck. Slides closed while rendering is skipped
+    # (cached stages) wait until their partial movies are known
+    def __init__(self, *args, **kwargs):
+        self.deck: Optional[StreamingDeck] = None
+        self.streamedSlides = 0
+        self.previousMedia = None
+        super().__init__(*args, **kwargs)
+
+    def endSlide(self, loop: bool = False, autonext: bool = False, notes: str = None, shownextnotes: bool = False):
+        super().endSlide(loop=loop, autonext=autonext, notes=notes, shownextnotes=shownextnotes)
+        if self.streamsDeck():
+            self.streamSlides()
+
+    def streamsDeck(self) -> bool:
+        # Stage workers and benchmark runs render pieces of the deck side by side, only a full render owns the
+        # presentation file
+        if getattr(self, "renderOnly", None) is not None or getattr(self, "renderGaps", False):
+            return False
+        return config.write_to_movie and not self.renderer.skip_animations
+
+    def streamSlides(self, final: bool = False) -> None:
+        while self.streamedSlides < len(self.slideRanges):
+            index = self.streamedSlides
+            # A slide showing the next one's notes waits for that slide to end
+            if self.slideOptions[index]["shownextnotes"] and index + 1 >= len(self.slideOptions) and not final:
+                break
+
+            options = self.deckOptions(index)
+            media = self.slideMedia(index)
+
+            slide = SlideDeck()
+            if media is not None:
+                slide.addVideo(media, **options)
+                self.previousMedia = media
+            elif self.previousMedia is not None:
+                slide.addPicture(self.previousMedia["last"], options.get("autonext", False), options.get("notes"))
+            else:
+                self.streamedSlides += 1
+                continue
+
+            if self.deck is None:
+                self.deck = StreamingDeck(self.presentationPath())
+            self.deck.append(slide)
+            self.streamedSlides += 1
+
+    def exportPresentation(self) -> Path:
+        self.streamSlides(final=True)
+        self.slideMediaCache.evict()
+
+        cache = self.slideMediaCache
+        path = self.presentationPath()
+        logger.info(f"Streamed {len(self.deck or [])} slides to {path}, {cache.hits} reused and {cache.misses} rebuilt")
+        return path
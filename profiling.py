@@ -0,0 +1,315 @@
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from manim import MathTex, config, logger
+from manim.utils import tex_file_writing
+
+from texcache import texCache
+
+# PROFILE_RENDER=1 profiles with resident memory samples, PROFILE_RENDER=trace tracks Python allocations instead
+profileMode = os.environ.get("PROFILE_RENDER", "")
+
+counterNames = ("frames", "plays", "waits", "animationTime", "rasterizeTime", "encodeTime", "texTime", "texCompiles",
+                "texHits", "texMisses")
+
+
+def _residentBytes() -> int:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return 0
+
+    # Peak instead of current where /proc is missing, ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _describe(animations: tuple) -> str:
+    return ", ".join(type(animation).__name__ for animation in animations) or "-"
+
+
+class Segment:
+    # A slide or stage, measured as the difference of the profiler's running counters at its two ends
+    def __init__(self, name: str, start: Dict[str, float]):
+        self.name = name
+        self.start = start
+        self.stages: List[str] = []
+        self.peakMemory = 0
+
+    def close(self, end: Dict[str, float]) -> dict:
+        result = {"name": self.name, "wall": end["wall"] - self.start["wall"]}
+        result.update({name: end[name] - self.start[name] for name in counterNames})
+        result["interpolateTime"] = result["animationTime"] - result["rasterizeTime"] - result["encodeTime"]
+        result["otherTime"] = result["wall"] - result["animationTime"] - result["texTime"]
+        result["peakMemory"] = self.peakMemory
+        if self.stages:
+            result["stages"] = self.stages
+        return result
+
+
+class RenderProfiler:
+    # Wraps the renderer, file writer and TeX entry points of one scene, attributing wall time, frames, TeX cache
+    # traffic and memory to the current slide and stage
+    def __init__(self, scene, traceMemory: bool = False):
+        self.scene = scene
+        self.traceMemory = traceMemory
+        self.totals = dict.fromkeys(counterNames, 0)
+
+        self.startTime = None
+        self.slide: Optional[Segment] = None
+        self.stage: Optional[Segment] = None
+        self.slides: List[dict] = []
+        self.stages: List[dict] = []
+        self.calls: List[dict] = []
+
+        self._inCall = False
+        self._texDepth = 0
+        self._restore = []
+
+    def snapshot(self) -> Dict[str, float]:
+        values = dict(self.totals, wall=time.perf_counter())
+        values["texHits"] = texCache.hits
+        values["texMisses"] = texCache.misses
+        return values
+
+    def start(self) -> "RenderProfiler":
+        if self.traceMemory:
+            tracemalloc.start()
+
+        renderer = self.scene.renderer
+        self._timed(renderer, "update_frame", "rasterizeTime")
+        self._timed(renderer.file_writer, "write_frame", "encodeTime")
+        self._wrapAddFrame(renderer)
+
+        # Nested calls (Tex builds through MathTex, the cache builds through both) are only timed once
+        self._timed(MathTex, "__init__", "texTime", nested=True)
+        self._timed(texCache, "mathTex", "texTime", nested=True)
+        self._timed(tex_file_writing, "compile_tex", None, count="texCompiles")
+
+        self.startTime = time.perf_counter()
+        self.slide = Segment("slide 0", self.snapshot())
+        return self
+
+    def stop(self) -> None:
+        for owner, name, original in reversed(self._restore):
+            if original is None:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, original)
+        self._restore.clear()
+
+        if self.traceMemory:
+            tracemalloc.stop()
+
+    def _patch(self, owner, name: str, wrapper) -> None:
+        # Class and module attributes are put back as they were, instance attributes are removed again
+        self._restore.append((owner, name, vars(owner).get(name)))
+        setattr(owner, name, wrapper)
+
+    def _timed(self, owner, name: str, counter: Optional[str], nested: bool = False, count: str = None) -> None:
+        original = getattr(owner, name, None)
+        if original is None:
+            return
+
+        totals = self.totals
+        profiler = self
+
+        def wrapper(*args, **kwargs):
+            if nested and profiler._texDepth:
+                return original(*args, **kwargs)
+
+            profiler._texDepth += nested
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                if counter:
+                    totals[counter] += time.perf_counter() - start
+                if count:
+                    totals[count] += 1
+                profiler._texDepth -= nested
+
+        self._patch(owner, name, wrapper)
+
+    def _wrapAddFrame(self, renderer) -> None:
+        original = renderer.add_frame
+
+        def addFrame(frame, num_frames=1, *args, **kwargs):
+            self.totals["frames"] += num_frames
+            self._sampleMemory()
+            return original(frame, num_frames, *args, **kwargs)
+
+        self._patch(renderer, "add_frame", addFrame)
+
+    def _sampleMemory(self) -> None:
+        if self.traceMemory:
+            memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.reset_peak()
+        else:
+            memory = _residentBytes()
+
+        for segment in (self.slide, self.stage):
+            if segment is not None:
+                segment.peakMemory = max(segment.peakMemory, memory)
+
+    @contextmanager
+    def call(self, kind: str, animations: tuple):
+        # Scene.wait goes through play, only the outermost call is recorded
+        if self._inCall:
+            yield
+            return
+
+        self._inCall = True
+        start = self.snapshot()
+        try:
+            yield
+        finally:
+            self._inCall = False
+            self.totals[kind + "s"] += 1
+            self.totals["animationTime"] += time.perf_counter() - start["wall"]
+            self._sampleMemory()
+
+            end = self.snapshot()
+            self.calls.append({
+                "kind": kind,
+                "slide": len(self.slides),
+                "stage": self.scene.currentStage,
+                "animations": _describe(animations),
+                "wall": end["wall"] - start["wall"],
+                "frames": end["frames"] - start["frames"],
+                "rasterizeTime": end["rasterizeTime"] - start["rasterizeTime"],
+                "encodeTime": end["encodeTime"] - start["encodeTime"],
+                "texTime": end["texTime"] - start["texTime"],
+            })
+
+    def openStage(self, name: str) -> None:
+        self.stage = Segment(name, self.snapshot())
+        if name not in self.slide.stages:
+            self.slide.stages.append(name)
+
+    def closeStage(self) -> None:
+        self._sampleMemory()
+        self.stages.append(self.stage.close(self.snapshot()))
+        self.stage = None
+
+    def closeSlide(self, last: bool = False) -> None:
+        self._sampleMemory()
+        end = self.snapshot()
+        result = self.slide.close(end)
+
+        # Whatever runs after the final endSlide is only worth reporting if it drew something
+        if not last or result["plays"] or result["waits"]:
+            self.slides.append(result)
+
+        self.slide = Segment(f"slide {len(self.slides)}", end)
+        if self.stage is not None:
+            self.slide.stages.append(self.stage.name)
+
+    def report(self) -> dict:
+        return {
+            "scene": type(self.scene).__name__,
+            "quality": [config.pixel_width, config.pixel_height, config.frame_rate],
+            "wall": time.perf_counter() - self.startTime,
+            "memoryMode": "traced" if self.traceMemory else "resident",
+            "totals": dict(self.totals, texHits=texCache.hits, texMisses=texCache.misses),
+            "slides": self.slides,
+            "stages": self.stages,
+            "calls": self.calls,
+        }
+
+    def write(self, directory: Path = None) -> Path:
+        directory = directory or Path(config.media_dir) / "profiles"
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{type(self.scene).__name__}.json"
+
+        report = self.report()
+        path.write_text(json.dumps(report, indent=2))
+        print(summary(report))
+        logger.info(f"Render profile written to {path}")
+        return path
+
+
+def summary(report: dict, rows: int = 15) -> str:
+    header = f"{'':<28}{'wall':>9}{'frames':>8}{'interp':>9}{'raster':>9}{'encode':>9}{'tex':>9}{'hit/miss':>10}" \
+             f"{'memory':>10}"
+
+    def line(entry: dict, name: str) -> str:
+        return (f"{name[:27]:<28}{entry['wall']:>8.2f}s{entry['frames']:>8}{entry['interpolateTime']:>8.2f}s"
+                f"{entry['rasterizeTime']:>8.2f}s{entry['encodeTime']:>8.2f}s{entry['texTime']:>8.2f}s"
+                f"{entry['texHits']:>5}/{entry['texMisses']:<4}{entry['peakMemory'] / 2 ** 20:>8.0f}MB")
+
+    lines = [f"{report['scene']}: {report['wall']:.2f}s total, {report['totals']['frames']} frames"]
+    for title, key in (("Slowest slides", "slides"), ("Stages", "stages")):
+        entries = sorted(report[key], key=lambda entry: entry["wall"], reverse=True)
+        lines += ["", title, header]
+        for entry in entries[:rows]:
+            name = entry["name"]
+            if entry.get("stages"):
+                name += f" ({', '.join(entry['stages'])})"
+            lines.append(line(entry, name))
+
+    return "\n".join(lines)
+
+
+class ProfiledScene:
+    # Mixin that profiles the render when PROFILE_RENDER is set, goes before StageScene and the PPTX scene
+    def __init__(self, *args, **kwargs):
+        self.profiler: Optional[RenderProfiler] = None
+        super().__init__(*args, **kwargs)
+
+        if profileMode not in ("", "0"):
+            self.profiler = RenderProfiler(self, traceMemory=profileMode == "trace").start()
+
+    def play(self, *args, **kwargs):
+        if self.profiler is None:
+            return super().play(*args, **kwargs)
+
+        with self.profiler.call("play", args):
+            return super().play(*args, **kwargs)
+
+    def wait(self, *args, **kwargs):
+        if self.profiler is None:
+            return super().wait(*args, **kwargs)
+
+        with self.profiler.call("wait", ()):
+            return super().wait(*args, **kwargs)
+
+    def endSlide(self, *args, **kwargs):
+        super().endSlide(*args, **kwargs)
+        if self.profiler is not None:
+            self.profiler.closeSlide()
+
+    def beginStage(self, name: str) -> None:
+        super().beginStage(name)
+        if self.profiler is not None:
+            self.profiler.openStage(name)
+
+    def endStage(self) -> None:
+        if self.profiler is not None:
+            self.profiler.closeStage()
+        super().endStage()
+
+    def tear_down(self):
+        if self.profiler is not None:
+            self.profiler.closeSlide(last=True)
+        super().tear_down()
+
+    def render(self, *args, **kwargs):
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            if self.profiler is not None:
+                self.profiler.stop()
+                self.profiler.write()
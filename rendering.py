@@ -0,0 +1,294 @@
+import functools
+import hashlib
+import multiprocessing
+import os
+import queue
+import traceback
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional
+
+import manim
+import numpy as np
+from manim import DEFAULT_WAIT_TIME, config, logger
+from PIL import Image
+
+from stages import _hashCamera, _hashMobject, _partialMovieFiles, skipRendering
+
+
+class HoldClips:
+    # Still clips of held frames under media/holds, keyed by the frame's pixels, length and encoding settings
+    def __init__(self, directory: Optional[Path] = None):
+        self._directory = directory
+
+    @property
+    def directory(self) -> Path:
+        directory = self._directory or Path(config.media_dir) / "holds"
+        directory.mkdir(parents=True, exist_ok=True)
+        return directory
+
+    @staticmethod
+    def key(frame: np.ndarray, frames: int) -> str:
+        digest = hashlib.sha256()
+        digest.update(repr((frame.shape, frames, config.frame_rate, config.movie_file_extension,
+                            manim.__version__)).encode())
+        digest.update(np.ascontiguousarray(frame).tobytes())
+        return digest.hexdigest()[:32]
+
+    def still(self, frame: np.ndarray, key: str) -> Path:
+        path = self.directory / f"{key}.png"
+        if not path.exists():
+            tempPath = path.with_suffix(f".{os.getpid()}.tmp.png")
+            Image.fromarray(frame).convert("RGB").save(tempPath)
+            os.replace(tempPath, path)
+        return path
+
+    def clip(self, frame: np.ndarray, frames: int, fileWriter) -> Path:
+        # One frame repeated for the whole hold, written through manim's own partial movie stream so the clip gets
+        # the codec, pixel format, rate and quality settings of the partial movies it is concatenated with
+        key = self.key(frame, frames)
+        path = self.directory / f"{key}{config.movie_file_extension}"
+        if path.exists():
+            return path
+
+        self.still(frame, key)
+        tempPath = path.with_name(f"{key}.{os.getpid()}.tmp{config.movie_file_extension}")
+        # open_partial_movie_stream from manim 0.19, the ffmpeg pipe before
+        openStream = getattr(fileWriter, "open_partial_movie_stream", None) or fileWriter.open_movie_pipe
+        closeStream = getattr(fileWriter, "close_partial_movie_stream", None) or fileWriter.close_movie_pipe
+        openStream(file_path=str(tempPath))
+        try:
+            for _ in range(frames):
+                fileWriter.write_frame(frame)
+        finally:
+            closeStream()
+        os.replace(tempPath, path)
+        return path
+
+
+class HoldFrameScene:
+    # Mixin for waits on a frozen frame: the frame is drawn once and stands in as a still clip for the whole wait,
+    # instead of rasterizing and piping the same frame to ffmpeg once per frame. Waits with running updaters or a
+    # stop condition render as usual. The still of every hold is kept per slide in holdStills
+    def __init__(self, *args, **kwargs):
+        self.holdClips = HoldClips()
+        self.holdStills: List[dict] = []
+        self.holdSlide = 0
+        super().__init__(*args, **kwargs)
+
+    def endSlide(self, *args, **kwargs):
+        super().endSlide(*args, **kwargs)
+        self.holdSlide += 1
+
+    def _canHold(self, stop_condition, frozen_frame) -> bool:
+        if stop_condition is not None or frozen_frame is False or config.transparent:
+            return False
+        if not config.write_to_movie or self.renderer.skip_animations or _partialMovieFiles(self) is None:
+            return False
+        return frozen_frame or not self._updatersRunning()
+
+    def _updatersRunning(self) -> bool:
+        # What Wait.is_static_wait is worked out from. Scene.should_update_mobjects reads it off the last compiled
+        # animation, which before compile is the previous play's or none at all
+        if self.always_update_mobjects or self.updaters:
+            return True
+        return any(mob.has_time_based_updater() for mob in self.get_mobject_family_members())
+
+    def wait(self, duration: float = DEFAULT_WAIT_TIME, stop_condition=None, frozen_frame: bool = None, **kwargs):
+        frames = int(duration * config.frame_rate)
+        if frames < 1 or not self._canHold(stop_condition, frozen_frame):
+            return super().wait(duration, stop_condition=stop_condition, frozen_frame=frozen_frame, **kwargs)
+
+        # Drawn from a blank frame, the last play's static layer would put its mobjects under themselves again
+        renderer = self.renderer
+        staticImage = renderer.static_image
+        renderer.static_image = None
+        renderer.update_frame(self)
+        frame = renderer.get_frame()
+        renderer.static_image = staticImage
+        clip = self.holdClips.clip(frame, frames, renderer.file_writer)
+
+        # The wait still advances scene time and the play count, it just leaves no file of its own
+        files = _partialMovieFiles(self)
+        start = len(files)
+        with skipRendering(self):
+            result = super().wait(duration, stop_condition=stop_condition, frozen_frame=frozen_frame, **kwargs)
+
+        if len(files) == start + 1 and files[-1] is None:
+            files[-1] = str(clip)
+            self.holdStills.append({"slide": self.holdSlide, "duration": duration, "clip": str(clip),
+                                    "still": str(clip.with_suffix(".png"))})
+        else:
+            logger.warning(f"Hold of {duration}s did not map to a single animation, it was not rendered")
+
+        return result
+
+
+def _hashLayer(digest, mobject) -> None:
+    # Everything about a mobject that changes its pixels, beyond the points and colours stage hashing covers
+    _hashMobject(digest, mobject)
+    for mob in mobject.get_family():
+        digest.update(repr((getattr(mob, "stroke_width", None), getattr(mob, "background_stroke_width", None),
+                            getattr(mob, "z_index", None))).encode())
+        pixels = getattr(mob, "pixel_array", None)
+        if isinstance(pixels, np.ndarray):
+            digest.update(np.ascontiguousarray(pixels).tobytes())
+
+
+class StaticLayerScene:
+    # Mixin caching the rasterized static layer between plays. Manim draws the mobjects an animation doesn't move
+    # once per play and composites the moving ones over that image every frame; here that image is kept for the
+    # next plays with the same camera state and the same static mobjects, so a run of plays over unchanged axes,
+    # labels and pivots rasterizes them once. Any camera move changes the key
+    staticLayerEntries = 8
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.staticLayers: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.staticLayerHits = 0
+        self.staticLayerMisses = 0
+
+        original = getattr(self.renderer, "save_static_frame_data", None)
+        if original is not None:
+            self.renderer.save_static_frame_data = functools.partial(self._saveStaticFrameData, original)
+
+    def staticLayerKey(self, staticMobjects) -> str:
+        camera = self.camera
+        digest = hashlib.sha256()
+        digest.update(repr((camera.pixel_width, camera.pixel_height, camera.frame_width, camera.frame_height,
+                            tuple(camera.frame_center), str(camera.background_color))).encode())
+        _hashCamera(digest, camera)
+        for mobject in staticMobjects:
+            _hashLayer(digest, mobject)
+        return digest.hexdigest()
+
+    def _saveStaticFrameData(self, original, scene, staticMobjects):
+        renderer = self.renderer
+        if not staticMobjects:
+            return original(scene, staticMobjects)
+
+        # A skipped play shows no frame, so there is nothing to draw the background for
+        if renderer.skip_animations:
+            renderer.static_image = None
+            return None
+
+        key = self.staticLayerKey(staticMobjects)
+        image = self.staticLayers.get(key)
+        if image is not None:
+            self.staticLayers.move_to_end(key)
+            self.staticLayerHits += 1
+            renderer.static_image = image
+            return image
+
+        self.staticLayerMisses += 1
+        image = original(scene, staticMobjects)
+        if image is not None:
+            self.staticLayers[key] = image
+            if len(self.staticLayers) > self.staticLayerEntries:
+                self.staticLayers.popitem(last=False)
+        return image
+
+
+# Scene and frame times of the play being rendered, set right before the workers are forked
+_forkedPlay = None
+
+
+def _renderInterleaved(worker: int, workers: int, frames: multiprocessing.Queue) -> None:
+    # Every worker steps through all frame times so updaters see the same dt sequence as a serial render, but only
+    # rasterizes every workers-th frame
+    scene, times = _forkedPlay
+    renderer = scene.renderer
+    try:
+        for i, t in enumerate(times):
+            scene.update_to_time(t)
+            if i % workers == worker:
+                renderer.update_frame(scene, scene.moving_mobjects)
+                frames.put(renderer.get_frame())
+    except Exception:
+        frames.put(traceback.format_exc())
+
+
+def _nextFrame(frames: multiprocessing.Queue, process: multiprocessing.Process) -> np.ndarray:
+    while True:
+        try:
+            frame = frames.get(timeout=1)
+            break
+        except queue.Empty:
+            if not process.is_alive():
+                raise RuntimeError(f"Frame worker {process.name} exited with code {process.exitcode}")
+
+    if isinstance(frame, str):
+        raise RuntimeError(f"Frame worker {process.name} failed:\n{frame}")
+    return frame
+
+
+def _frameWorkers() -> int:
+    value = os.environ.get("PARALLEL_FRAMES", "")
+    if value == "auto":
+        return os.cpu_count() or 1
+    return int(value) if value.isdigit() else 1
+
+
+class ParallelFrameScene:
+    # Opt-in mixin rasterizing long animations on several cores, enabled with PARALLEL_FRAMES=<workers> or auto.
+    # Forked workers inherit the scene as it is at the start of the play, step it through every frame time and each
+    # rasterize an interleaved share of the frames, while the parent steps its own copy along and writes the frames
+    # in order. Every worker repeats every frame's updates, so this only pays off when rasterizing dominates.
+    # Unset, skipped plays, stop conditions, plays under parallelMinFrames and platforms without fork use manim's
+    # serial loop. A failing worker stops the whole play with its traceback, raised at its first missing frame
+    frameWorkers = _frameWorkers()
+    parallelMinFrames = 48
+    framesInFlight = 4
+
+    def _canRenderParallel(self, skip_rendering: bool, frameCount: int) -> bool:
+        renderer = self.renderer
+        if skip_rendering or renderer.skip_animations or getattr(self, "skip_animation_preview", False):
+            return False
+        if self.stop_condition is not None or self.frameWorkers < 2 or frameCount < self.parallelMinFrames:
+            return False
+        return "fork" in multiprocessing.get_all_start_methods() and hasattr(renderer, "add_frame")
+
+    def play_internal(self, skip_rendering: bool = False):
+        global _forkedPlay
+
+        self.duration = self.get_run_time(self.animations)
+        frameCount = int(np.ceil(self.duration * config.frame_rate))
+        if not self._canRenderParallel(skip_rendering, frameCount):
+            return super().play_internal(skip_rendering)
+
+        self.time_progression = self._get_animation_time_progression(self.animations, self.duration)
+        times = list(self.time_progression.iterable)
+        workers = min(self.frameWorkers, len(times))
+
+        context = multiprocessing.get_context("fork")
+        queues = [context.Queue(maxsize=self.framesInFlight) for _ in range(workers)]
+        _forkedPlay = (self, times)
+        processes = [context.Process(target=_renderInterleaved, args=(worker, workers, queues[worker]),
+                                     name=f"frames-{worker}", daemon=True) for worker in range(workers)]
+        for process in processes:
+            process.start()
+        _forkedPlay = None
+
+        try:
+            for i, t in enumerate(self.time_progression):
+                self.update_to_time(t)
+                worker = i % workers
+                self.renderer.add_frame(_nextFrame(queues[worker], processes[worker]))
+        except BaseException:
+            # The others may be blocked on a full queue nobody reads any more
+            for process in processes:
+                process.terminate()
+            raise
+        finally:
+            for process in processes:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.kill()
+
+        for animation in self.animations:
+            animation.finish()
+            animation.clean_up_from_scene(self)
+        if not self.renderer.skip_animations:
+            self.update_mobjects(0)
+        self.renderer.static_image = None
+        self.time_progression.close()
@@ -0,0 +1,72 @@
+from typing import Callable, List, Sequence, Union
+
+import numpy as np
+from manim import Mobject
+
+# Update functions receive every member's points at once, plus the frame's dt
+GroupUpdate = Callable[[Union[np.ndarray, List[np.ndarray]], float], None]
+
+
+def polylinePoints(corners: np.ndarray) -> np.ndarray:
+    # Bezier points of straight polylines, (M, C, 3) corners to the (M, 4(C - 1), 3) set_points_as_corners layout
+    start, end = corners[:, :-1], corners[:, 1:]
+    thirds = np.array([0, 1 / 3, 2 / 3, 1])[None, None, :, None]
+    points = start[:, :, None] + thirds * (end - start)[:, :, None]
+    return points.reshape(len(corners), -1, 3)
+
+
+def centers(points: np.ndarray) -> np.ndarray:
+    # Bounding box centre of every member, same as get_center
+    return (points.max(axis=1) + points.min(axis=1)) / 2
+
+
+class UpdaterGroup:
+    # Members with the same number of points share one (M, P, 3) buffer and each member's points become a view
+    # of its row, so an update touches every member with array operations. Members must then be moved through
+    # the group; anything that reassigns a member's points (set_points_as_corners...) needs relink()
+    def __init__(self, mobjects: Sequence[Mobject], update: GroupUpdate):
+        self.update = update
+        self.leaves = [leaf for mobject in mobjects for leaf in mobject.family_members_with_points()]
+        self.points = None
+        self.relink()
+
+    def relink(self) -> None:
+        if len({leaf.points.shape for leaf in self.leaves}) == 1:
+            self.points = np.stack([leaf.points for leaf in self.leaves])
+            for i, leaf in enumerate(self.leaves):
+                leaf.points = self.points[i]
+        else:
+            self.points = [leaf.points for leaf in self.leaves]
+
+    def run(self, dt: float) -> None:
+        self.update(self.points, dt)
+
+
+class UpdaterScheduler(Mobject):
+    # A single pointless mobject whose one updater runs each registered group once per frame, so updater
+    # overhead grows with the number of groups rather than the number of animated mobjects
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.groups: List[UpdaterGroup] = []
+        self.time = 0.0
+        self.add_updater(self._tick)
+
+    @staticmethod
+    def _tick(scheduler: "UpdaterScheduler", dt: float) -> None:
+        scheduler.time += dt
+        for group in scheduler.groups:
+            group.run(dt)
+
+    def attach(self, scene) -> "UpdaterScheduler":
+        # At the back, so every mobject after it is treated as moving and redrawn each frame
+        scene.add(self)
+        scene.bring_to_back(self)
+        return self
+
+    def register(self, mobjects: Sequence[Mobject], update: GroupUpdate) -> UpdaterGroup:
+        group = UpdaterGroup(mobjects, update)
+        self.groups.append(group)
+        return group
+
+    def unregister(self, group: UpdaterGroup) -> None:
+        self.groups.remove(group)
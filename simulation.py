@@ -0,0 +1,258 @@
+import numpy as np
+
+# Dormand-Prince 5(4) tableau, error weights and dense output weights (Hairer, Norsett & Wanner)
+dpA = (
+    (),
+    (1 / 5,),
+    (3 / 40, 9 / 40),
+    (44 / 45, -56 / 15, 32 / 9),
+    (19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729),
+    (9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656),
+    (35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84),
+)
+dpE = (71 / 57600, 0, -71 / 16695, 71 / 1920, -17253 / 339200, 22 / 525, -1 / 40)
+dpD = (-12715105075 / 11282082432, 0, 87487479700 / 32700410799, -10690763975 / 1880347072,
+       701980252875 / 199316789632, -1453857185 / 822651844, 69997945 / 29380423)
+
+
+class Ensemble:
+    # Structure of arrays state, one row per variable and one column per member, advanced with fixed step RK4
+    variables = ()
+
+    def __init__(self, count: int, dtype=np.float64):
+        self.state = np.zeros((len(self.variables), count), dtype=dtype)
+        self.time = 0.0
+
+        self._k = np.empty((4, *self.state.shape), dtype=dtype)
+        self._temp = np.empty_like(self.state)
+
+    def __len__(self) -> int:
+        return self.state.shape[1]
+
+    def __getattr__(self, name):
+        variables = type(self).variables
+        if name in variables:
+            return self.state[variables.index(name)]
+        raise AttributeError(name)
+
+    def derivative(self, state: np.ndarray, out: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def step(self, dt: float, substeps: int = 1) -> None:
+        h = dt / substeps
+        k1, k2, k3, k4 = self._k
+        temp = self._temp
+        state = self.state
+
+        for _ in range(substeps):
+            self.derivative(state, k1)
+
+            np.multiply(k1, h / 2, out=temp)
+            temp += state
+            self.derivative(temp, k2)
+
+            np.multiply(k2, h / 2, out=temp)
+            temp += state
+            self.derivative(temp, k3)
+
+            np.multiply(k3, h, out=temp)
+            temp += state
+            self.derivative(temp, k4)
+
+            k2 += k3
+            k2 *= 2
+            k2 += k1
+            k2 += k4
+            k2 *= h / 6
+            state += k2
+
+        self.time += dt
+
+    def adaptiveFrames(self, frameTimes, rtol: float = 1e-6, atol: float = 1e-9, initialStep: float = None,
+                       maxStep: float = np.inf):
+        # Dormand-Prince 5(4) with a step size per member, frames are sampled from each member's dense output
+        # so no step has to land on a frame time. Yields a (variables, members) array per frame time.
+        frameTimes = np.asarray(frameTimes, dtype=float)
+        variables, count = self.state.shape
+
+        def derivative(y):
+            return self.derivative(y, np.empty_like(y))
+
+        y = self.state.astype(float)
+        k1 = derivative(y)
+        t = np.full(count, self.time)
+        if initialStep is None:
+            initialStep = np.diff(frameTimes).min() if frameTimes.size > 1 else 1e-2
+        h = np.full(count, min(initialStep, maxStep))
+
+        # Last accepted step of each member, kept for dense output
+        tOld = t.copy()
+        hOld = np.zeros(count)
+        rcont = np.zeros((5, variables, count))
+        rcont[0] = y
+
+        for frameTime in frameTimes:
+            while True:
+                behind = np.flatnonzero(t < frameTime)
+                if behind.size == 0:
+                    break
+
+                # Indexing copies, so members that are all behind keep working on the full arrays
+                index = slice(None) if behind.size == count else behind
+                yB, hB, kB = y[:, index], h[index], [k1[:, index]]
+
+                for stage in range(1, 7):
+                    yStage = yB + hB * sum(a * k for a, k in zip(dpA[stage], kB) if a)
+                    kB.append(derivative(yStage))
+                yNew = yStage
+
+                error = hB * sum(e * k for e, k in zip(dpE, kB) if e)
+                scale = atol + rtol * np.maximum(np.abs(yB), np.abs(yNew))
+                errorNorm = np.sqrt(np.mean((error / scale) ** 2, axis=0))
+
+                accepted = errorNorm <= 1
+                factor = np.clip(0.9 * np.maximum(errorNorm, 1e-10) ** -0.2, 0.2, 10)
+                factor[~accepted] = np.minimum(factor[~accepted], 1)
+
+                if accepted.any():
+                    members = np.arange(count)[index][accepted]
+                    hA = hB[accepted]
+                    yA, yNewA = yB[:, accepted], yNew[:, accepted]
+                    difference = yNewA - yA
+                    bspl = hA * kB[0][:, accepted] - difference
+
+                    rcont[0][:, members] = yA
+                    rcont[1][:, members] = difference
+                    rcont[2][:, members] = bspl
+                    rcont[3][:, members] = difference - hA * kB[6][:, accepted] - bspl
+                    rcont[4][:, members] = hA * sum(d * k[:, accepted] for d, k in zip(dpD, kB) if d)
+
+                    tOld[members] = t[members]
+                    hOld[members] = hA
+                    t[members] += hA
+                    y[:, members] = yNewA
+                    k1[:, members] = kB[6][:, accepted]
+
+                h[index] = np.minimum(hB * factor, maxStep)
+
+            # Members that have not stepped yet sit exactly at the frame time
+            theta = np.divide(frameTime - tOld, hOld, out=np.ones(count), where=hOld > 0)
+            yield rcont[0] + theta * (rcont[1] + (1 - theta) * (rcont[2] + theta * (rcont[3] + (1 - theta) * rcont[4])))
+
+        self.state[:] = y
+        self.time = float(t.max())
+
+    def run(self, steps: int, dt: float, substeps: int = 1):
+        # Yields a copy of the state after every step, e.g. once per rendered frame
+        for _ in range(steps):
+            self.step(dt, substeps)
+            yield self.state.copy()
+
+
+class DoublePendulumEnsemble(Ensemble):
+    # The closed form theta_1'' and theta_2'' from formulas2, integrated for every member at once
+    variables = ("theta1", "theta2", "omega1", "omega2")
+
+    def __init__(self, theta1, theta2, omega1=0.0, omega2=0.0, m1: float = 1, m2: float = 1, l1: float = 1,
+                 l2: float = 1, g: float = 9.81, dtype=np.float64):
+        theta1, theta2, omega1, omega2 = np.broadcast_arrays(theta1, theta2, omega1, omega2)
+        super().__init__(theta1.size, dtype)
+
+        self.state[0] = theta1.ravel()
+        self.state[1] = theta2.ravel()
+        self.state[2] = omega1.ravel()
+        self.state[3] = omega2.ravel()
+
+        self.m1, self.m2 = m1, m2
+        self.l1, self.l2 = l1, l2
+        self.g = g
+
+    @classmethod
+    def spread(cls, count: int, startAngle1: float, startAngle2: float, angleDelta: float, **kwargs):
+        # Same layout as the Unity DoublePendulumMultiple script, theta_1 fanned out by angleDelta per member
+        return cls(startAngle1 + np.arange(count) * angleDelta, np.full(count, startAngle2), **kwargs)
+
+    def derivative(self, state: np.ndarray, out: np.ndarray) -> np.ndarray:
+        theta1, theta2, omega1, omega2 = state
+        m1, m2, l1, l2, g = self.m1, self.m2, self.l1, self.l2, self.g
+
+        delta = theta1 - theta2
+        sinDelta = np.sin(delta)
+        cosDelta = np.cos(delta)
+        omega1Sq = omega1 * omega1
+        omega2Sq = omega2 * omega2
+
+        # cos(2 theta_1 - 2 theta_2) = 2cos^2(delta) - 1, saves a trig call per member
+        denominator = 2 * m1 + m2 - m2 * (2 * cosDelta * cosDelta - 1)
+
+        out[0] = omega1
+        out[1] = omega2
+        out[2] = (-g * (2 * m1 + m2) * np.sin(theta1) - m2 * g * np.sin(theta1 - 2 * theta2)
+                  - 2 * sinDelta * m2 * (omega2Sq * l2 + omega1Sq * l1 * cosDelta)) / (l1 * denominator)
+        out[3] = (2 * sinDelta * (omega1Sq * l1 * (m1 + m2) + g * (m1 + m2) * np.cos(theta1)
+                                  + omega2Sq * l2 * m2 * cosDelta)) / (l2 * denominator)
+        return out
+
+    def positions(self, theta1: np.ndarray = None, theta2: np.ndarray = None):
+        # x_1 = l_1sin(theta_1), y_1 = -l_1cos(theta_1) and so on, as derived in doublePendulumDerive
+        if theta1 is None:
+            theta1, theta2 = self.state[0], self.state[1]
+        x1 = self.l1 * np.sin(theta1)
+        y1 = -self.l1 * np.cos(theta1)
+        x2 = x1 + self.l2 * np.sin(theta2)
+        y2 = y1 - self.l2 * np.cos(theta2)
+        return x1, y1, x2, y2
+
+
+class LorenzEnsemble(Ensemble):
+    variables = ("x", "y", "z")
+
+    def __init__(self, x, y, z, sigma: float = 10, rho: float = 28, beta: float = 8 / 3, dtype=np.float64):
+        x, y, z = np.broadcast_arrays(x, y, z)
+        super().__init__(x.size, dtype)
+
+        self.state[0] = x.ravel()
+        self.state[1] = y.ravel()
+        self.state[2] = z.ravel()
+
+        self.sigma = sigma
+        self.rho = rho
+        self.beta = beta
+
+    @classmethod
+    def grid(cls, number: int, xSplit: int, ySplit: int, zSplit: int, xDiff: float, yDiff: float = None,
+             zDiff: float = None, initX: float = 1, initY: float = 1, initZ: float = 1, **kwargs):
+        # Same index split as the Unity LorenzSystem script
+        i = np.arange(number)
+        yDiff = xDiff if yDiff is None else yDiff
+        zDiff = xDiff if zDiff is None else zDiff
+
+        return cls(
+            initX + (i % xSplit) * xDiff,
+            initY + ((i % zSplit) // ySplit) * yDiff,
+            initZ + (i // zSplit) * zDiff,
+            **kwargs
+        )
+
+    def derivative(self, state: np.ndarray, out: np.ndarray) -> np.ndarray:
+        x, y, z = state
+
+        np.subtract(y, x, out=out[0])
+        out[0] *= self.sigma
+
+        np.subtract(self.rho, z, out=out[1])
+        out[1] *= x
+        out[1] -= y
+
+        np.multiply(x, y, out=out[2])
+        out[2] -= self.beta * z
+        return out
+
+    def positions(self) -> np.ndarray:
+        # (N, 3) view of the current points, no copy
+        return self.state.T
+
+    def frames(self, count: int, dt: float, substeps: int = 1):
+        for _ in range(count):
+            self.step(dt, substeps)
+            yield self.positions()
@@ -0,0 +1,444 @@
+import functools
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from types import ModuleType
+from typing import Callable, List, Optional
+
+import numpy as np
+from manim import Mobject, Scene, config, logger, tempconfig
+
+
+@contextmanager
+def skipRendering(scene, skip: bool = True):
+    # Animations still run to their end state, but nothing is rasterized or encoded. With skip=False the opposite,
+    # for the one segment a stage render shows
+    renderer = scene.renderer
+    original = renderer._original_skipping_status
+    renderer._original_skipping_status = skip
+    renderer.skip_animations = skip
+    try:
+        yield
+    finally:
+        renderer._original_skipping_status = original
+        renderer.skip_animations = original
+
+
+def _hashMobject(digest, mobject: Mobject) -> None:
+    for mob in mobject.get_family():
+        digest.update(type(mob).__name__.encode())
+        digest.update(np.ascontiguousarray(mob.points).tobytes())
+        for attribute in ("fill_rgbas", "stroke_rgbas", "rgbas"):
+            values = getattr(mob, attribute, None)
+            if isinstance(values, np.ndarray):
+                digest.update(np.ascontiguousarray(values).tobytes())
+
+
+def _hashCamera(digest, camera) -> None:
+    frame = getattr(camera, "frame", None)
+    if isinstance(frame, Mobject):
+        _hashMobject(digest, frame)
+
+    getTrackers = getattr(camera, "get_value_trackers", None)
+    if getTrackers is not None:
+        digest.update(repr([tracker.get_value() for tracker in getTrackers()]).encode())
+
+
+# Modules next to this one are the project's own, their source is part of what a stage renders
+projectDir = Path(__file__).resolve().parent
+
+
+def _localModule(value) -> Optional[ModuleType]:
+    module = value if isinstance(value, ModuleType) else inspect.getmodule(value)
+    file = getattr(module, "__file__", None)
+    if file and Path(file).resolve().parent == projectDir:
+        return module
+    return None
+
+
+def _codeNames(code) -> set:
+    # Names used by the function and by the lambdas and comprehensions inside it
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names |= _codeNames(const)
+    return names
+
+
+def _hashModule(digest, module: ModuleType, seen: set) -> None:
+    if module in seen:
+        return
+    seen.add(module)
+
+    digest.update(inspect.getsource(module).encode())
+    for value in vars(module).values():
+        imported = _localModule(value)
+        if imported is not None:
+            _hashModule(digest, imported, seen)
+
+
+def _hashSource(digest, function: Callable, owner: type = None, seen: set = None) -> None:
+    # Follows helpers and methods on self through the stage's module, and hashes every other project module
+    # (simulation, pointcloud, trajstore...) it reaches in full
+    # Stage methods reached through self are wrappers from this module, the original holds the code and globals
+    function = inspect.unwrap(function)
+    seen = set() if seen is None else seen
+    if function in seen:
+        return
+    seen.add(function)
+
+    digest.update(inspect.getsource(function).encode())
+    namespace = function.__globals__
+    for name in sorted(_codeNames(function.__code__)):
+        value = namespace.get(name)
+        if value is None and owner is not None:
+            value = inspect.getattr_static(owner, name, None)
+            value = getattr(value, "__func__", value)
+
+        module = _localModule(value) if value is not None else None
+        if module is not None and module.__name__ != function.__module__:
+            _hashModule(digest, module, seen)
+        elif inspect.isfunction(value) and module is not None:
+            _hashSource(digest, value, owner, seen)
+        elif inspect.isclass(value) and module is not None and value not in seen:
+            seen.add(value)
+            digest.update(inspect.getsource(value).encode())
+            for member in vars(value).values():
+                member = getattr(member, "__func__", member)
+                if inspect.isfunction(member):
+                    _hashSource(digest, member, owner, seen)
+        elif isinstance(value, (int, float, str, tuple)):
+            digest.update(f"{name}={value!r}".encode())
+
+
+def stageFingerprint(scene, method: Callable, args: tuple, kwargs: dict) -> str:
+    digest = hashlib.sha256()
+    _hashSource(digest, method, type(scene))
+    digest.update(repr((args, sorted(kwargs.items()))).encode())
+    digest.update(repr((config.pixel_width, config.pixel_height, config.frame_rate)).encode())
+
+    _hashCamera(digest, scene.camera)
+    for mobject in scene.mobjects:
+        _hashMobject(digest, mobject)
+    for mobject in getattr(scene, "destroyLater", []):
+        _hashMobject(digest, mobject)
+
+    return digest.hexdigest()
+
+
+class StageCache:
+    # Partial movie files of one stage, stored under media/stages/<Scene>/<stage>
+    def __init__(self, scene, name: str):
+        self.directory = Path(config.media_dir) / "stages" / type(scene).__name__ / name
+        self.manifestPath = self.directory / "manifest.json"
+
+    def load(self, fingerprint: str) -> Optional[List[Optional[str]]]:
+        try:
+            manifest = json.loads(self.manifestPath.read_text())
+        except (OSError, ValueError):
+            return None
+
+        if manifest.get("fingerprint") != fingerprint:
+            return None
+
+        files = [str(self.directory / name) if name else None for name in manifest["files"]]
+        if not all(Path(file).exists() for file in files if file):
+            return None
+
+        return files
+
+    def store(self, fingerprint: str, files: List[Optional[str]]) -> None:
+        if self.directory.exists():
+            shutil.rmtree(self.directory)
+        self.directory.mkdir(parents=True)
+
+        names = []
+        for i, file in enumerate(files):
+            if file is None:
+                names.append(None)
+                continue
+
+            name = f"{i:05}{Path(file).suffix}"
+            shutil.copyfile(file, self.directory / name)
+            names.append(name)
+
+        self.manifestPath.write_text(json.dumps({"fingerprint": fingerprint, "files": names}))
+
+
+def _partialMovieFiles(scene) -> Optional[list]:
+    fileWriter = getattr(scene.renderer, "file_writer", None)
+    return getattr(fileWriter, "partial_movie_files", None)
+
+
+def emptyState(scene) -> None:
+    # Initial state builder for stages that start from a blank frame
+    pass
+
+
+class StageScene:
+    # Mixin tracking stage calls and slide boundaries, used for stage caching and parallel stage renders. Code in
+    # construct between two stages is a gap: renderOnly renders one stage with everything else skipped, renderGaps
+    # renders the gaps with every stage skipped
+    def __init__(self, *args, **kwargs):
+        self.currentStage = None
+        self.stageCount = 0
+        self.stagePlan = None
+        self.renderOnly = None
+        self.renderedStage = None
+        self.renderGaps = False
+        self.stageRanges = []
+        self.playCount = 0
+        self.slideEnds = []
+        super().__init__(*args, **kwargs)
+
+    def setup(self):
+        super().setup()
+        if self.renderOnly is not None:
+            self.renderer._original_skipping_status = True
+            self.renderer.skip_animations = True
+
+    def play(self, *args, **kwargs):
+        self.playCount += 1
+        return super().play(*args, **kwargs)
+
+    def endSlide(self, *args, **kwargs):
+        super().endSlide(*args, **kwargs)
+
+        files = _partialMovieFiles(self)
+        self.slideEnds.append(len(files) if files is not None else 0)
+
+    def beginStage(self, name: str) -> None:
+        self.currentStage = name
+
+    def endStage(self) -> None:
+        self.currentStage = None
+
+
+def _runCached(scene, method: Callable, args: tuple, kwargs: dict):
+    files = _partialMovieFiles(scene)
+    if files is None or config.disable_caching or scene.renderer.skip_animations:
+        return method(scene, *args, **kwargs)
+
+    name = method.__name__
+    fingerprint = stageFingerprint(scene, method, args, kwargs)
+    cache = StageCache(scene, name)
+    cached = cache.load(fingerprint)
+    start = len(files)
+
+    if cached is None:
+        result = method(scene, *args, **kwargs)
+        cache.store(fingerprint, files[start:])
+        return result
+
+    with skipRendering(scene):
+        result = method(scene, *args, **kwargs)
+
+    if len(files) - start == len(cached):
+        files[start:] = cached
+        logger.info(f"Reused {len(cached)} cached animations for stage {name}")
+    else:
+        logger.warning(f"Stage {name} played a different number of animations than its cache, re-render it")
+        cache.manifestPath.unlink(missing_ok=True)
+
+    return result
+
+
+def runStage(scene, method: Callable, args: tuple, kwargs: dict):
+    if scene.currentStage is not None:
+        return method(scene, *args, **kwargs)
+
+    index = scene.stageCount
+    scene.stageCount += 1
+    scene.beginStage(method.__name__)
+
+    try:
+        if scene.stagePlan is not None or scene.renderGaps:
+            if scene.stagePlan is not None:
+                scene.stagePlan.append(method.__name__)
+
+            files = _partialMovieFiles(scene) or []
+            start = {"start": len(files), "slideStart": len(scene.slideEnds), "playStart": scene.playCount}
+            with skipRendering(scene):
+                result = method(scene, *args, **kwargs)
+            scene.stageRanges.append({**start, "end": len(files), "slideEnd": len(scene.slideEnds),
+                                      "playEnd": scene.playCount})
+            return result
+
+        if scene.renderOnly is None:
+            return _runCached(scene, method, args, kwargs)
+
+        targetIndex, targetName = scene.renderOnly
+        targetInitial = getattr(getattr(type(scene), targetName), "initial", None)
+
+        if index > targetIndex or (index < targetIndex and targetInitial is not None):
+            return None
+
+        if index < targetIndex:
+            with skipRendering(scene):
+                return method(scene, *args, **kwargs)
+
+        if targetInitial is not None:
+            with skipRendering(scene):
+                targetInitial(scene)
+
+        files = _partialMovieFiles(scene)
+        scene.renderedStage = {"start": len(files), "slideStart": len(scene.slideEnds)}
+        with skipRendering(scene, skip=False):
+            result = _runCached(scene, method, args, kwargs)
+        scene.renderedStage.update(end=len(files), slideEnd=len(scene.slideEnds))
+        return result
+    finally:
+        scene.endStage()
+
+
+def stage(method: Callable = None, *, initial: Callable = None) -> Callable:
+    # Marks a scene method as a cacheable unit of the deck, optionally with a builder for the state it starts from
+    if method is None:
+        return functools.partial(stage, initial=initial)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return runStage(self, method, args, kwargs)
+
+    wrapper.isStage = True
+    wrapper.initial = initial
+    return wrapper
+
+
+def _planScene(sceneClass: type):
+    # Runs construct without rendering to learn which stages it calls, in order, and what plays between them
+    with tempconfig({"write_to_movie": False, "save_last_frame": False}):
+        scene = sceneClass()
+        scene.stagePlan = []
+        scene.setup()
+        with skipRendering(scene):
+            scene.construct()
+        return scene
+
+
+def planStages(sceneClass: type) -> List[str]:
+    return _planScene(sceneClass).stagePlan
+
+
+def _gapBounds(scene, total: dict) -> List[dict]:
+    # The stretches of construct before, between and after the stages, in the keys stageRanges uses
+    bounds = []
+    previous = {"end": 0, "slideEnd": 0, "playEnd": 0}
+    for stageRange in [*scene.stageRanges, {"start": total["end"], "slideStart": total["slideEnd"],
+                                            "playStart": total["playEnd"]}]:
+        bounds.append({"start": previous["end"], "end": stageRange["start"], "slideStart": previous["slideEnd"],
+                       "slideEnd": stageRange["slideStart"], "plays": stageRange["playStart"] - previous["playEnd"]})
+        previous = stageRange
+    return bounds
+
+
+def _segment(scene, rendered: dict) -> dict:
+    files = _partialMovieFiles(scene)[rendered["start"]:rendered["end"]]
+    ends = [end - rendered["start"] for end in scene.slideEnds[rendered["slideStart"]:rendered["slideEnd"]]]
+
+    # Slide boundaries are counted in rendered files, animations skipped by manim leave no file behind
+    return {
+        "files": [str(file) for file in files if file is not None],
+        "slideEnds": [sum(file is not None for file in files[:end]) for end in ends],
+    }
+
+
+def _renderStage(sceneClass: type, index: int, name: str, overrides: dict) -> dict:
+    with tempconfig({**overrides, "output_file": f"{sceneClass.__name__}Stage{index:02}"}):
+        scene = sceneClass()
+        scene.renderOnly = (index, name)
+
+        # Scene.render directly, the stitched deck is assembled by the parent process
+        Scene.render(scene)
+        return _segment(scene, scene.renderedStage)
+
+
+def _renderGaps(sceneClass: type, overrides: dict) -> List[dict]:
+    # Every gap rendered once, in one process and in order, since each one continues from the state before it
+    with tempconfig({**overrides, "output_file": f"{sceneClass.__name__}Gaps"}):
+        scene = sceneClass()
+        scene.renderGaps = True
+        Scene.render(scene)
+
+        files = _partialMovieFiles(scene)
+        total = {"end": len(files), "slideEnd": len(scene.slideEnds), "playEnd": scene.playCount}
+        return [_segment(scene, bound) for bound in _gapBounds(scene, total)]
+
+
+def renderStagesParallel(sceneClass: type, workers: int = None) -> Optional[Path]:
+    planned = _planScene(sceneClass)
+    plan = planned.stagePlan
+    overrides = {
+        "media_dir": str(config.media_dir),
+        "pixel_width": config.pixel_width,
+        "pixel_height": config.pixel_height,
+        "frame_rate": config.frame_rate,
+        "disable_caching": config.disable_caching,
+    }
+
+    if not plan:
+        logger.warning(f"{sceneClass.__name__} has no stages to render")
+        return None
+
+    total = {"end": 0, "slideEnd": 0, "playEnd": planned.playCount}
+    hasGaps = any(bound["plays"] for bound in _gapBounds(planned, total))
+
+    with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(plan) + hasGaps)) as pool:
+        gapsFuture = pool.submit(_renderGaps, sceneClass, overrides) if hasGaps else None
+        results = list(pool.map(_renderStage, [sceneClass] * len(plan), range(len(plan)), plan,
+                                [overrides] * len(plan)))
+        gaps = gapsFuture.result() if gapsFuture else [{"files": [], "slideEnds": []}] * (len(plan) + 1)
+
+    # Gap before every stage, then the stage, and the gap after the last one
+    segments = [segment for gap, result in zip(gaps, results) for segment in (gap, result)] + [gaps[-1]]
+
+    files = []
+    slideEnds = []
+    for result in segments:
+        slideEnds += [len(files) + end for end in result["slideEnds"]]
+        files += result["files"]
+
+    outputDir = Path(config.media_dir) / "stages"
+    outputDir.mkdir(parents=True, exist_ok=True)
+    output = outputDir / f"{sceneClass.__name__}.mp4"
+
+    listFile = outputDir / f"{sceneClass.__name__}.txt"
+    listFile.write_text("".join(f"file '{Path(file).resolve().as_posix()}'\n" for file in files))
+    subprocess.run(
+        ["ffmpeg", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", str(listFile), "-c", "copy",
+         str(output)],
+        check=True
+    )
+
+    (outputDir / f"{sceneClass.__name__}_slides.json").write_text(json.dumps({
+        "stages": plan,
+        "files": files,
+        "slideEnds": slideEnds,
+    }, indent=2))
+
+    logger.info(f"Rendered {len(plan)} stages of {sceneClass.__name__} in parallel to {output}")
+    return output
+
+
+if __name__ == "__main__":
+    import argparse
+    import importlib
+
+    parser = argparse.ArgumentParser(description="Render the stages of a scene in parallel and stitch them")
+    parser.add_argument("module")
+    parser.add_argument("scene")
+    parser.add_argument("-q", "--quality", default="h", choices=["l", "m", "h", "p", "k"])
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    arguments = parser.parse_args()
+
+    qualities = {"l": "low_quality", "m": "medium_quality", "h": "high_quality", "p": "production_quality",
+                 "k": "fourk_quality"}
+
+    with tempconfig({"quality": qualities[arguments.quality]}):
+        renderStagesParallel(getattr(importlib.import_module(arguments.module), arguments.scene), arguments.workers)
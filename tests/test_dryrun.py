@@ -0,0 +1,29 @@
+import json
+
+import pytest
+
+pytest.importorskip("manim")
+pytest.importorskip("manim_pptx")
+
+from manim import tempconfig
+
+import main
+from dryrun import dryRun
+
+
+class TitleOnly(main.Main):
+    def construct(self):
+        self.titleStage()
+
+
+def test_dryRunTitleStage(tmp_path):
+    with tempconfig({"media_dir": str(tmp_path)}):
+        output = dryRun(TitleOnly)
+
+    manifest = json.loads(output.read_text())
+    assert manifest["slideCount"] == 1
+
+    slide = manifest["slides"][0]
+    assert [animation["animations"] for animation in slide["animations"]] == [["Create"], ["Wait"]]
+    assert slide["duration"] > 0
+    assert [box["mobject"] for box in slide["mobjects"]] == ["Text 'Chaos Theory'"]
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("manim")
+
+from manim import LEFT, RIGHT, Circle, FadeIn, Scene, Square, VGroup, tempconfig
+
+from lifecycle import LifecycleScene
+from pointcloud import RingTrail
+
+
+class SweptScene(LifecycleScene, Scene):
+    pass
+
+
+def test_containerAddedEmptyAndFilledLater():
+    with tempconfig({"dry_run": True}):
+        scene = SweptScene()
+        group = VGroup()
+        trail = RingTrail(4, 8)
+        circle = Circle()
+        scene.add(group, trail, circle)
+
+        scene.play(FadeIn(Square()))
+        assert scene.mobjects.index(group) < scene.mobjects.index(trail) < scene.mobjects.index(circle)
+
+        group.add(Square())
+        trail.append(np.zeros((4, 3)))
+        scene.sweep()
+        assert scene.mobjects.index(group) < scene.mobjects.index(trail) < scene.mobjects.index(circle)
+        assert not scene.parked
+
+
+def test_transparentMobjectIsParkedAndComesBack():
+    with tempconfig({"dry_run": True}):
+        scene = SweptScene()
+        hidden = Circle().set_opacity(0)
+        front = Square()
+        scene.add(hidden, front)
+
+        scene.sweep()
+        assert hidden not in scene.mobjects and hidden in scene.parked
+
+        scene.play(hidden.animate.set_opacity(1))
+        assert scene.mobjects.index(hidden) < scene.mobjects.index(front)
+
+
+def test_directChangeUnparksOnNextWait():
+    with tempconfig({"dry_run": True}):
+        scene = SweptScene()
+        hidden = Circle().set_opacity(0)
+        away = Square().shift(RIGHT * 50)
+        scene.add(hidden, away)
+
+        scene.sweep()
+        assert scene.parked == [hidden, away]
+
+        hidden.set_opacity(1)
+        away.shift(LEFT * 50)
+        scene.wait(0.1)
+        assert scene.mobjects[-2:] == [hidden, away]
+
+
+def test_removedParkedMobjectIsReleased():
+    with tempconfig({"dry_run": True}):
+        scene = SweptScene()
+        hidden = Circle().set_opacity(0)
+        scene.add(hidden)
+
+        scene.sweep()
+        scene.remove(hidden)
+        assert not scene.parked and not scene.parkedAnchors
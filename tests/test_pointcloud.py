@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("manim")
+
+from pointcloud import PointCloud, RingTrail
+
+
+def test_copiedCloudKeepsPointSize():
+    cloud = PointCloud(np.zeros((3, 3)), pointSize=7).copy()
+    assert cloud.pointSize == 7
+    assert len(cloud) == 3
+
+
+def test_copiedTrailAppends():
+    trail = RingTrail(2, 3)
+    trail.append(np.ones((2, 3)))
+
+    copy = trail.copy()
+    copy.append(np.full((2, 3), 2.0))
+    copy.append(np.full((2, 3), 3.0))
+
+    assert (copy.head, copy.filled) == (0, 3)
+    assert (trail.head, trail.filled) == (1, 1)
+    assert len(copy) == 6 and len(trail) == 2
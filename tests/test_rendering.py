@@ -0,0 +1,68 @@
+import json
+import shutil
+import subprocess
+
+import pytest
+
+pytest.importorskip("manim")
+
+from manim import FadeIn, FadeOut, Scene, Square, tempconfig
+
+from rendering import HoldFrameScene
+
+
+class HoldScene(HoldFrameScene, Scene):
+    pass
+
+
+def test_waitAfterNonWaitPlay():
+    with tempconfig({"dry_run": True}):
+        scene = HoldScene()
+        assert not scene._updatersRunning()
+
+        square = Square()
+        scene.play(FadeIn(square))
+        assert not scene._updatersRunning()
+        scene.wait(0.5)
+
+        square.add_updater(lambda mob, dt: mob.rotate(dt))
+        assert scene._updatersRunning()
+        scene.wait(0.5)
+
+
+def test_holdDecisionAfterNonWaitPlay(monkeypatch):
+    with tempconfig({"dry_run": True}):
+        scene = HoldScene()
+        scene.play(FadeIn(Square()))
+
+        # Past the output checks, straight to the updater check that used to read the FadeIn as a Wait
+        monkeypatch.setattr("rendering._partialMovieFiles", lambda scene: [])
+        with tempconfig({"write_to_movie": True}):
+            assert scene._canHold(None, None)
+
+
+class HeldSquare(HoldFrameScene, Scene):
+    def construct(self):
+        square = Square()
+        self.play(FadeIn(square), run_time=0.5)
+        self.wait(1)
+        self.play(FadeOut(square), run_time=0.5)
+
+
+def _streamParameters(path):
+    fields = "codec_name,profile,pix_fmt,width,height,r_frame_rate,time_base"
+    output = subprocess.run(["ffprobe", "-v", "error", "-select_streams", "v:0", "-show_entries", f"stream={fields}",
+                             "-of", "json", str(path)], check=True, capture_output=True, text=True).stdout
+    return json.loads(output)["streams"][0]
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None, reason="needs ffmpeg")
+def test_holdClipMatchesPartialMovies(tmp_path):
+    with tempconfig({"media_dir": str(tmp_path), "quality": "low_quality", "disable_caching": True}):
+        scene = HeldSquare()
+        scene.render()
+
+        files = scene.renderer.file_writer.partial_movie_files
+        assert len(scene.holdStills) == 1 and scene.holdStills[0]["clip"] in files
+        parameters = [_streamParameters(path) for path in files]
+        assert all(parameter == parameters[0] for parameter in parameters)
@@ -0,0 +1,19 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("manim")
+
+from stages import _gapBounds
+
+
+def test_gapsAroundStages():
+    # Plays 0-2 before the first stage, stage 2-5, nothing between, stage 5-6, then one more play
+    scene = SimpleNamespace(stageRanges=[
+        {"start": 2, "end": 5, "slideStart": 1, "slideEnd": 2, "playStart": 2, "playEnd": 5},
+        {"start": 5, "end": 6, "slideStart": 2, "slideEnd": 3, "playStart": 5, "playEnd": 6},
+    ])
+    bounds = _gapBounds(scene, {"end": 7, "slideEnd": 4, "playEnd": 7})
+
+    assert [(bound["start"], bound["end"], bound["plays"]) for bound in bounds] == [(0, 2, 2), (5, 5, 0), (6, 7, 1)]
+    assert [(bound["slideStart"], bound["slideEnd"]) for bound in bounds] == [(0, 1), (2, 2), (3, 4)]
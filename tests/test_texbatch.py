@@ -0,0 +1,35 @@
+import pytest
+
+pytest.importorskip("manim")
+
+from manim import MathTex, tempconfig
+
+import texbatch
+from texbatch import TexRequest, batchCompile, texExpressions
+
+parts = ("E", "=", r"\frac{1}{2}mv^2", "+mgh")
+
+
+def test_everyPartIsRecorded():
+    expressions = [expression for expression, environment, template in texExpressions(TexRequest(MathTex, parts, 30))]
+    assert len(expressions) == len(parts) + 1
+    assert all(any(part in expression for expression in expressions[1:]) for part in parts)
+
+
+def test_batchHasOnePagePerPartAndTheJoinedString(tmp_path, monkeypatch):
+    documents = []
+    monkeypatch.setattr(texbatch, "_compileDocument", lambda template, files: documents.append(files) or 0)
+
+    with tempconfig({"media_dir": str(tmp_path)}):
+        batchCompile([TexRequest(MathTex, parts, 30)])
+
+    assert [len(files) for files in documents] == [len(parts) + 1]
+
+
+def test_stageMethodsReadTheirOwnModule():
+    main = pytest.importorskip("main")
+    from texbatch import collectMethodTex
+
+    requests = collectMethodTex(main.Main, "doublePendulumDerive", main.texSplitters)
+    assert requests
+    assert {request.fontS for request in requests if request.texClass is MathTex} == {main.fontSize}
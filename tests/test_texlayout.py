@@ -0,0 +1,81 @@
+import shutil
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip("manim")
+pytest.importorskip("manim_slides")
+pytest.importorskip("manim_pptx")
+if shutil.which("latex") is None:
+    pytest.skip("needs a LaTeX installation", allow_module_level=True)
+
+from manim import DOWN, LEFT, RIGHT, UP, MathTex
+
+from main import layoutTexM, playTexPages, splitTexM
+
+strings = ["x=a+b", r"y_1=\frac{1}{2}||+c||-d", r"\int_0^1 t\,dt=\frac{1}{2}", "z=1"]
+
+
+def chainedLayout(texs, startPos, downMultiplier=None, specialAlign=None):
+    # The next_to / shift / align_to chain generateTexM used before layoutTexM
+    texs[0].move_to(startPos)
+    for i, tex in enumerate(texs[1:]):
+        tex.next_to(texs[i], DOWN * 0.5)
+        tex.shift(DOWN * (downMultiplier[i] if downMultiplier else 0))
+
+    texPart2 = [tex[1] for tex in texs]
+    for i, texPart in enumerate(texPart2):
+        if i == 0:
+            if specialAlign:
+                texPart.align_to(specialAlign[1], LEFT)
+        else:
+            texPart.align_to(texPart2[i - 1], LEFT)
+    for i in range(len(texs)):
+        texs[i][0].next_to(texPart2[i], LEFT)
+        texs[i][2:].next_to(texPart2[i], RIGHT)
+    return texs
+
+
+@pytest.mark.parametrize("downMultiplier", [None, [0.3, 0, 1.2]])
+@pytest.mark.parametrize("aligned", [False, True])
+def test_layoutMatchesChainedCalls(downMultiplier, aligned):
+    specialAlign = MathTex(*splitTexM("w=2||+3")).shift(LEFT * 2 + UP) if aligned else None
+    startPos = UP * 2 + RIGHT * 0.5
+
+    expected = chainedLayout([MathTex(*splitTexM(s)) for s in strings], startPos, downMultiplier, specialAlign)
+    pages = layoutTexM([MathTex(*splitTexM(s)) for s in strings], startPos, downMultiplier, specialAlign)
+    assert len(pages) == 1
+    actual = pages[0]
+
+    for expectedTex, actualTex in zip(expected, actual):
+        for expectedPart, actualPart in zip(expectedTex, actualTex):
+            np.testing.assert_allclose(actualPart.get_all_points(), expectedPart.get_all_points(), atol=1e-9)
+
+
+def test_pagesStartBackAtTheTop():
+    startPos = UP * 3
+    texs = [MathTex(*splitTexM(s)) for s in strings * 4]
+    pages = layoutTexM(texs, startPos, pageBottom=-1)
+
+    assert len(pages) > 1
+    assert sum(pages, []) == texs
+    for page in pages:
+        assert min(tex.get_bottom()[1] for tex in page) >= -1 - 1e-9
+        assert all(tex[1].get_left()[0] == pytest.approx(texs[0][1].get_left()[0]) for tex in page)
+
+    # A new page starts at the height the line would have as the first of a fresh layout
+    for page in pages[1:]:
+        fresh = layoutTexM([MathTex(*splitTexM((strings * 4)[texs.index(page[0])]))], startPos)[0][0]
+        np.testing.assert_allclose(page[0].get_all_points()[:, 1], fresh.get_all_points()[:, 1], atol=1e-9)
+
+
+def test_playTexPagesClearsEveryPageButTheLast():
+    played, slides = [], []
+    scene = SimpleNamespace(play=lambda *animations: played.append([type(a).__name__ for a in animations]),
+                            wait=lambda duration: None, endSlide=lambda: slides.append(len(played)))
+    first, second = [MathTex("a=b")], [MathTex("c=d"), MathTex("e=f")]
+
+    playTexPages(scene, [first, second])
+    assert played == [["Write"], ["Unwrite"], ["Write"], ["Write"]]
+    assert slides == [1]
@@ -0,0 +1,300 @@
+import ast
+import inspect
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import textwrap
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from manim import DEFAULT_FONT_SIZE, MathTex, Tex, TexTemplate, config, logger
+from manim.mobject.text import tex_mobject
+from manim.utils.tex_file_writing import compile_tex, convert_to_svg, generate_tex_file
+
+from texcache import texCache
+
+# Maps a helper name (createTexM, generateTexM...) to the function splitting each of its strings into MathTex parts
+TexSplitters = Dict[str, Callable[[str], List[str]]]
+
+texClasses = {"MathTex": MathTex, "Tex": Tex}
+fontKeywords = ("fontS", "font_size")
+
+
+class TexRequest(NamedTuple):
+    texClass: type
+    parts: Tuple[str, ...]
+    fontS: float
+
+
+# Stands in for every SVG while recording, so the mobject is built to the end and asks for each part as well
+placeholderSvg = '<svg xmlns="http://www.w3.org/2000/svg" width="1" height="1"><path d="M0 0 L1 0 L1 1 Z"/></svg>'
+
+
+def _evalFontSize(node: Optional[ast.expr], namespace: dict, default: float) -> float:
+    if node is None:
+        return default
+
+    try:
+        return float(eval(compile(ast.Expression(node), "<fontS>", "eval"), dict(namespace)))
+    except Exception:
+        return default
+
+
+def _defaultFontSize(function: Callable) -> float:
+    try:
+        parameter = inspect.signature(function).parameters.get("fontS")
+    except (TypeError, ValueError):
+        return DEFAULT_FONT_SIZE
+
+    if parameter is None or parameter.default is inspect.Parameter.empty:
+        return DEFAULT_FONT_SIZE
+    return parameter.default
+
+
+def collectMethodTex(sceneClass: type, name: str, splitters: TexSplitters, seen: set = None) -> List[TexRequest]:
+    # Statically finds every TeX string a scene method (and the methods it calls on self) will compile
+    seen = set() if seen is None else seen
+    if name in seen:
+        return []
+    seen.add(name)
+
+    # Stage methods are wrapped in stages.py, their source and globals are the original's
+    method = inspect.unwrap(getattr(sceneClass, name, None))
+    if not inspect.isfunction(method):
+        return []
+
+    try:
+        tree = ast.parse(textwrap.dedent(inspect.getsource(method)))
+    except (OSError, TypeError, SyntaxError):
+        return []
+
+    namespace = method.__globals__
+    requests = []
+
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call):
+            continue
+
+        func = node.func
+        if isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name) and func.value.id == "self":
+            requests += collectMethodTex(sceneClass, func.attr, splitters, seen)
+            continue
+        if not isinstance(func, ast.Name):
+            continue
+
+        strings = [arg.value for arg in node.args if isinstance(arg, ast.Constant) and isinstance(arg.value, str)]
+        if not strings:
+            continue
+
+        fontNode = next((keyword.value for keyword in node.keywords if keyword.arg in fontKeywords), None)
+
+        if func.id in splitters:
+            fontS = _evalFontSize(fontNode, namespace, _defaultFontSize(namespace.get(func.id)))
+            requests += [TexRequest(MathTex, tuple(splitters[func.id](string)), fontS) for string in strings]
+        elif func.id in texClasses:
+            fontS = _evalFontSize(fontNode, namespace, DEFAULT_FONT_SIZE)
+            requests.append(TexRequest(texClasses[func.id], tuple(strings), fontS))
+
+    return requests
+
+
+def collectSceneTex(scene, splitters: TexSplitters, methods: List[str] = None) -> List[TexRequest]:
+    requests = []
+    seen = set()
+    for name in methods or ["construct"]:
+        requests += collectMethodTex(type(scene), name, splitters, seen)
+
+    return list(dict.fromkeys(requests))
+
+
+def texExpressions(request: TexRequest) -> List[Tuple[str, Optional[str], TexTemplate]]:
+    # Builds the mobject against placeholder SVGs to learn every expression manim compiles for it: the joined string
+    # and, for MathTex, each part on its own
+    recorded = []
+
+    with tempfile.TemporaryDirectory() as workDir:
+        placeholder = Path(workDir) / "placeholder.svg"
+        placeholder.write_text(placeholderSvg)
+
+        def record(expression, environment=None, tex_template=None):
+            recorded.append((expression, environment, tex_template or config.tex_template))
+            return placeholder
+
+        original = tex_mobject.tex_to_svg_file
+        tex_mobject.tex_to_svg_file = record
+        try:
+            request.texClass(*request.parts)
+        except Exception as error:
+            logger.debug(f"Could not record all TeX for {request.parts}: {error}")
+        finally:
+            tex_mobject.tex_to_svg_file = original
+
+    return recorded
+
+
+TexGroups = Dict[str, Tuple[TexTemplate, Dict[Path, Path]]]
+
+
+def missingTex(requests: List[TexRequest]) -> TexGroups:
+    # SVG and tex file of every expression not compiled yet, grouped by template
+    groups: TexGroups = {}
+
+    for request in requests:
+        for expression, environment, template in texExpressions(request):
+            texFile = generate_tex_file(expression, environment, template)
+            svgFile = texFile.with_suffix(".svg")
+            if svgFile.exists():
+                continue
+
+            groups.setdefault(template.body, (template, {}))[1][svgFile] = texFile
+
+    return groups
+
+
+def _compileGroups(groups: TexGroups) -> int:
+    return sum(_compileDocument(template, files) for template, files in groups.values() if files)
+
+
+def batchCompile(requests: List[TexRequest]) -> int:
+    # Compiles every missing expression of the same template as pages of one document in a single latex run
+    return _compileGroups(missingTex(requests))
+
+
+def _compiled(request: TexRequest) -> bool:
+    return all(generate_tex_file(expression, environment, template).with_suffix(".svg").exists()
+               for expression, environment, template in texExpressions(request))
+
+
+def _compileEach(template: TexTemplate, files: Dict[Path, Path]) -> int:
+    # What manim would do on demand, one latex and one dvisvgm run per expression
+    compiled = 0
+    for svgFile, texFile in files.items():
+        try:
+            convert_to_svg(compile_tex(texFile, template.tex_compiler, template.output_format),
+                           template.output_format)
+            compiled += svgFile.exists()
+        except Exception as error:
+            logger.debug(f"Could not compile {texFile}: {error}")
+    return compiled
+
+
+def _compileDocument(template: TexTemplate, files: Dict[Path, Path]) -> int:
+    # dvisvgm only splits DVI and XDV into pages, PDF output is left to manim
+    if template.output_format not in (".dvi", ".xdv"):
+        logger.debug(f"Batch TeX compilation does not support {template.output_format} output")
+        return 0
+
+    preamble = None
+    pages = []
+
+    for texFile in files.values():
+        head, _, rest = texFile.read_text(encoding="utf-8").partition(r"\begin{document}")
+        pages.append(rest.partition(r"\end{document}")[0])
+        preamble = preamble or head
+
+    # Each page becomes a preview box, which is what standalone's preview option does for a single expression
+    preamble, found = re.subn(r"\\documentclass(\[[^\]]*\])?\{standalone\}",
+                              lambda _: "\\documentclass{article}\n\\usepackage[active,tightpage]{preview}",
+                              preamble, count=1)
+    if not found:
+        return 0
+
+    document = preamble + "\\begin{document}\n" + "".join(
+        f"\\begin{{preview}}{page}\\end{{preview}}\n" for page in pages
+    ) + "\\end{document}\n"
+
+    with tempfile.TemporaryDirectory() as workDir:
+        work = Path(workDir)
+        (work / "batch.tex").write_text(document, encoding="utf-8")
+
+        command = [template.tex_compiler, "-interaction=batchmode", "-halt-on-error", f"-output-directory={work}"]
+        if template.output_format == ".xdv":
+            command.append("-no-pdf")
+
+        result = subprocess.run([*command, "batch.tex"], cwd=work, capture_output=True)
+        if result.returncode != 0:
+            # One bad expression aborts the whole document, leave them to manim to report individually
+            logger.warning(f"Batch TeX compilation of {len(pages)} expressions failed, falling back to per-expression")
+            return 0
+
+        result = subprocess.run(
+            ["dvisvgm", str(work / f"batch{template.output_format}"), "--page=1-", "--no-fonts", "--verbosity=0",
+             f"--output={work / 'page-%p.svg'}"],
+            cwd=work, capture_output=True
+        )
+
+        # Pages map to expressions by position only, one dropped or split page would shift every later SVG onto the
+        # wrong expression and into manim's cache for good
+        pageFiles = {int(path.stem.rsplit("-", 1)[1]): path for path in work.glob("page-*.svg")}
+        if result.returncode != 0 or sorted(pageFiles) != list(range(1, len(files) + 1)):
+            logger.warning(f"Batch TeX compilation produced {len(pageFiles)} pages for {len(files)} expressions, "
+                           f"compiling them one by one")
+            return _compileEach(template, files)
+
+        # Copied next to the target first, manim must never see a half-written SVG under its cache name
+        for i, svgFile in enumerate(files, 1):
+            tempFile = svgFile.with_name(f"{svgFile.stem}.{os.getpid()}.tmp.svg")
+            shutil.move(pageFiles[i], tempFile)
+            os.replace(tempFile, svgFile)
+
+    return len(files)
+
+
+def _initWorker(mediaDir: str, texTemplate: TexTemplate) -> None:
+    config.media_dir = mediaDir
+    config.tex_template = texTemplate
+
+
+def _cacheRequests(requests: List[TexRequest], onlyCompiled: bool = False) -> None:
+    # Building the MathTex here stores its geometry in the shared on-disk cache for the scene process. With
+    # onlyCompiled, requests still missing an SVG are left alone rather than compiled by several workers at once
+    for request in requests:
+        if request.texClass is not MathTex or (onlyCompiled and not _compiled(request)):
+            continue
+        try:
+            texCache.mathTex(*request.parts, fontS=request.fontS)
+        except Exception as error:
+            logger.debug(f"Could not prewarm {request.parts}: {error}")
+
+
+def _prewarmChunk(requests: List[TexRequest]) -> int:
+    compiled = batchCompile(requests)
+    _cacheRequests(requests)
+    return compiled
+
+
+def prewarmTex(requests: List[TexRequest], workers: int = None) -> int:
+    workers = min(workers or os.cpu_count() or 1, len(requests))
+    if workers <= 1:
+        return _prewarmChunk(requests)
+
+    # Every missing SVG goes to exactly one worker. Requests share parts like "=", and two workers compiling the same
+    # expression write the same manim cache files
+    chunks: List[TexGroups] = [{} for _ in range(workers)]
+    for body, (template, files) in missingTex(requests).items():
+        for i, (svgFile, texFile) in enumerate(files.items()):
+            chunks[i % workers].setdefault(body, (template, {}))[1][svgFile] = texFile
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_initWorker,
+                             initargs=(str(config.media_dir), config.tex_template)) as pool:
+        compiled = sum(pool.map(_compileGroups, chunks))
+        list(pool.map(_cacheRequests, [requests[i::workers] for i in range(workers)], [True] * workers))
+
+    # Workers wrote to the cache directory behind this process's back
+    texCache.diskBytes = None
+    return compiled
+
+
+def compileSceneTex(scene, splitters: TexSplitters, methods: List[str] = None, workers: int = None) -> int:
+    requests = collectSceneTex(scene, splitters, methods)
+    requests = [request for request in requests
+                if not (request.texClass is MathTex and texCache.contains(*request.parts, fontS=request.fontS))]
+    if not requests:
+        return 0
+
+    compiled = prewarmTex(requests, workers)
+    logger.info(f"Prewarmed {len(requests)} TeX expressions for {type(scene).__name__} ({compiled} compiled)")
+    return compiled
@@ -0,0 +1,126 @@
+import hashlib
+import os
+import pickle
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+from manim import MathTex, TexTemplate, config
+
+
+class TexCache:
+    # On-disk cache of compiled MathTex geometry, keyed by the parts, font size and template used to build it
+    def __init__(self, directory: Optional[Path] = None, maxBytes: int = 512 * 1024 * 1024, memoryEntries: int = 256):
+        self._directory = directory
+        self.maxBytes = maxBytes
+        self.memoryEntries = memoryEntries
+        self.memory: "OrderedDict[str, MathTex]" = OrderedDict()
+        self.diskBytes = None
+
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def directory(self) -> Path:
+        # Resolved lazily so media_dir given on the command line is respected
+        directory = self._directory or Path(config.media_dir) / "texcache"
+        directory.mkdir(parents=True, exist_ok=True)
+        return directory
+
+    @staticmethod
+    def key(parts, fontS: float, template: TexTemplate = None, **kwargs) -> str:
+        template = template or config.tex_template
+
+        digest = hashlib.sha256()
+        digest.update(repr((tuple(parts), float(fontS), sorted(kwargs.items()))).encode())
+        digest.update(f"{template.tex_compiler}|{template.output_format}|{template.body}".encode())
+        return digest.hexdigest()
+
+    def mathTex(self, *parts: str, fontS: float, template: TexTemplate = None, **kwargs) -> MathTex:
+        key = self.key(parts, fontS, template, **kwargs)
+
+        tex = self.memory.get(key)
+        if tex is not None:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return tex.copy()
+
+        path = self.directory / f"{key}.pkl"
+        tex = self._load(path)
+
+        if tex is None:
+            self.misses += 1
+            if template is not None:
+                kwargs["tex_template"] = template
+            tex = MathTex(*parts, font_size=fontS, **kwargs)
+            self._store(path, tex)
+        else:
+            self.hits += 1
+
+        self.memory[key] = tex
+        if len(self.memory) > self.memoryEntries:
+            self.memory.popitem(last=False)
+
+        return tex.copy()
+
+    def contains(self, *parts: str, fontS: float, template: TexTemplate = None, **kwargs) -> bool:
+        key = self.key(parts, fontS, template, **kwargs)
+        return key in self.memory or (self.directory / f"{key}.pkl").exists()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "memory": len(self.memory), "diskBytes": self._diskBytes()}
+
+    def clear(self) -> None:
+        self.memory.clear()
+        for path in self.directory.glob("*.pkl"):
+            path.unlink(missing_ok=True)
+        self.diskBytes = 0
+
+    def _load(self, path: Path) -> Optional[MathTex]:
+        try:
+            tex = pickle.loads(path.read_bytes())
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, AttributeError, pickle.UnpicklingError):
+            # Corrupt or written by an incompatible manim version, rebuild it
+            path.unlink(missing_ok=True)
+            return None
+
+        # The modification time doubles as the last access time for LRU eviction
+        os.utime(path)
+        return tex
+
+    def _store(self, path: Path, tex: MathTex) -> None:
+        data = pickle.dumps(tex, protocol=pickle.HIGHEST_PROTOCOL)
+
+        tempPath = path.with_suffix(f".{os.getpid()}.tmp")
+        tempPath.write_bytes(data)
+        os.replace(tempPath, path)
+
+        self.diskBytes = self._diskBytes() + len(data)
+        if self.diskBytes > self.maxBytes:
+            self._evict()
+
+    def _diskBytes(self) -> int:
+        if self.diskBytes is None:
+            self.diskBytes = sum(entry.stat().st_size for entry in os.scandir(self.directory)
+                                 if entry.name.endswith(".pkl"))
+        return self.diskBytes
+
+    def _evict(self) -> None:
+        entries = sorted(
+            (entry.stat().st_mtime, entry.stat().st_size, entry.path)
+            for entry in os.scandir(self.directory) if entry.name.endswith(".pkl")
+        )
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entryPath in entries:
+            if total <= self.maxBytes:
+                break
+            Path(entryPath).unlink(missing_ok=True)
+            total -= size
+
+        self.diskBytes = total
+
+
+texCache = TexCache()
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import shutil
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+from manim import config, logger
+
+from simulation import Ensemble
+
+
+class Trajectory:
+    # Lazily mapped frames of a finished simulation, frame i lives in chunk i // chunkFrames
+    def __init__(self, directory: Path, openChunks: int = 4):
+        self.directory = directory
+        self.meta = json.loads((directory / "meta.json").read_text())
+        self.chunkFrames = self.meta["chunkFrames"]
+        self.frameCount = self.meta["frameCount"]
+        self.dt = self.meta["dt"]
+
+        self.openChunks = openChunks
+        self._chunks: "OrderedDict[int, np.ndarray]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return self.frameCount
+
+    def __getitem__(self, index: int) -> np.ndarray:
+        if index < 0:
+            index += self.frameCount
+        if not 0 <= index < self.frameCount:
+            raise IndexError(index)
+
+        return self._chunk(index // self.chunkFrames)[index % self.chunkFrames]
+
+    def __iter__(self):
+        for i in range(self.frameCount):
+            yield self[i]
+
+    def frameAt(self, time: float) -> np.ndarray:
+        return self[min(int(round(time / self.dt)), self.frameCount - 1)]
+
+    def _chunk(self, number: int) -> np.ndarray:
+        chunk = self._chunks.get(number)
+        if chunk is None:
+            chunk = np.load(self.directory / f"chunk_{number:05}.npy", mmap_mode="r")
+            self._chunks[number] = chunk
+            if len(self._chunks) > self.openChunks:
+                self._chunks.popitem(last=False)
+        else:
+            self._chunks.move_to_end(number)
+
+        return chunk
+
+
+class TrajectoryWriter:
+    def __init__(self, directory: Path, meta: dict, frameShape, dtype, chunkFrames: int):
+        self.directory = directory
+        self.meta = meta
+        self.frameShape = tuple(frameShape)
+        self.dtype = np.dtype(dtype)
+        self.chunkFrames = chunkFrames
+
+        self.frameCount = 0
+        self._chunk = None
+
+        directory.mkdir(parents=True, exist_ok=True)
+
+    def append(self, frame: np.ndarray) -> None:
+        offset = self.frameCount % self.chunkFrames
+        if offset == 0:
+            self._flush()
+            remaining = self.meta["frameCount"] - self.frameCount
+            self._chunk = np.lib.format.open_memmap(
+                self.directory / f"chunk_{self.frameCount // self.chunkFrames:05}.npy", mode="w+",
+                dtype=self.dtype, shape=(min(self.chunkFrames, remaining), *self.frameShape)
+            )
+
+        self._chunk[offset] = frame
+        self.frameCount += 1
+
+    def close(self) -> None:
+        self._flush()
+        self.meta.update(frameCount=self.frameCount, chunkFrames=self.chunkFrames, frameShape=self.frameShape,
+                         dtype=self.dtype.str)
+        (self.directory / "meta.json").write_text(json.dumps(self.meta, indent=2))
+
+    def _flush(self) -> None:
+        if self._chunk is not None:
+            self._chunk.flush()
+            self._chunk = None
+
+
+class TrajectoryStore:
+    def __init__(self, directory: Optional[Path] = None):
+        self._directory = directory
+
+    @property
+    def directory(self) -> Path:
+        return self._directory or Path(config.media_dir) / "trajectories"
+
+    @staticmethod
+    def key(ensemble: Ensemble, dt: float, substeps: int, frameCount: int, extra: dict = None,
+            frameShape: tuple = None, dtype=None) -> str:
+        # Class, initial state and scalar parameters (masses, sigma...) fully determine the simulation, the stored
+        # frames also depend on the view's shape and dtype
+        parameters = {name: value for name, value in vars(ensemble).items() if isinstance(value, (int, float))}
+
+        digest = hashlib.sha256()
+        digest.update(type(ensemble).__name__.encode())
+        digest.update(json.dumps([parameters, dt, substeps, frameCount, extra or {}], sort_keys=True).encode())
+        digest.update(repr((tuple(frameShape or ()), np.dtype(dtype).str if dtype is not None else None)).encode())
+        digest.update(np.ascontiguousarray(ensemble.state).tobytes())
+        return digest.hexdigest()
+
+    def open(self, key: str) -> Optional[Trajectory]:
+        directory = self.directory / key
+        if not (directory / "meta.json").exists():
+            return None
+        return Trajectory(directory)
+
+    def record(self, ensemble: Ensemble, frameCount: int, dt: float, substeps: int = 1,
+               view: Callable[[Ensemble], np.ndarray] = lambda ensemble: ensemble.state, dtype=np.float32,
+               chunkFrames: int = 256, extra: dict = None, rtol: float = None) -> Trajectory:
+        # Frame 0 is the initial state, followed by frameCount frames dt apart; reused if the same run was stored.
+        # With rtol the frames are sampled from the adaptive Dormand-Prince integrator instead of fixed RK4 steps
+        extra = {**(extra or {}), "rtol": rtol} if rtol is not None else extra
+        frameShape = view(ensemble).shape
+        key = self.key(ensemble, dt, substeps, frameCount, extra, frameShape, dtype)
+        trajectory = self.open(key)
+        if trajectory is not None:
+            logger.info(f"Reusing stored trajectory {key[:12]} ({trajectory.frameCount} frames)")
+            return trajectory
+
+        meta = {
+            "system": type(ensemble).__name__,
+            "parameters": {name: value for name, value in vars(ensemble).items() if isinstance(value, (int, float))},
+            "ensembleSize": len(ensemble),
+            "dt": dt,
+            "substeps": substeps,
+            "frameCount": frameCount + 1,
+            "extra": extra or {},
+        }
+
+        # Written to a temporary directory first so an interrupted run never looks complete
+        tempDirectory = self.directory / f"{key}.{os.getpid()}.tmp"
+        writer = TrajectoryWriter(tempDirectory, meta, frameShape, dtype, chunkFrames)
+        writer.append(view(ensemble))
+        if rtol is None:
+            for _ in range(frameCount):
+                ensemble.step(dt, substeps)
+                writer.append(view(ensemble))
+        else:
+            frameTimes = ensemble.time + dt * np.arange(1, frameCount + 1)
+            for frame in ensemble.adaptiveFrames(frameTimes, rtol=rtol, atol=rtol * 1e-3):
+                ensemble.state[:] = frame
+                writer.append(view(ensemble))
+        writer.close()
+
+        directory = self.directory / key
+        if directory.exists():
+            shutil.rmtree(tempDirectory)
+        else:
+            os.replace(tempDirectory, directory)
+
+        return Trajectory(directory)
+
+
+trajectoryStore = TrajectoryStore()